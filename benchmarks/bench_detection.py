@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Compare keep-out map detection backends on the CPU.
+
+Each installed backend (torch, onnx, openvino) runs the same synthetic panel
+image; model loading and one warm-up call are excluded, then the median
+per-image latency is measured. Keep-out masks are built with the pipeline's
+own code and compared by intersection-over-union against the first backend,
+so an INT8 model that is faster but misses objects shows up as a low IoU.
+
+Backends whose runtime is not installed, or whose model file is missing,
+are reported as skipped. Export models with scripts/export_detection_model.py.
+
+Usage:
+    python benchmarks/bench_detection.py
+    python benchmarks/bench_detection.py --backends torch openvino --segmentation
+    python benchmarks/bench_detection.py --onnx-model yolov8n.onnx --threads 4
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+import numpy as np
+
+from bench_pipeline import synthetic_photo
+from eink_pipeline.backends import BACKENDS, backend_available
+from eink_pipeline.detection import get_detector
+from eink_pipeline.pipeline import fit_image, keepout_mask_from_detections, load_image
+
+
+def mask_iou(a, b):
+    """Intersection-over-union of two keep-out masks (None = empty)."""
+    a = np.zeros(1, dtype=bool) if a is None else a > 0
+    b = np.zeros(1, dtype=bool) if b is None else b > 0
+    union = np.logical_or(a, b).sum()
+    return float(np.logical_and(a, b).sum() / union) if union else 1.0
+
+
+def run_backend(backend, image, args, model_path):
+    """Median seconds per image, detection count and keep-out mask for one backend."""
+    detector = get_detector(backend, args.model_size, args.segmentation, model_path, threads=args.threads)
+    detector.detect([image], args.confidence)  # warm-up
+
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        result = detector.detect([image], args.confidence)[0]
+        times.append(time.perf_counter() - start)
+
+    width, height = image.size
+    mask = keepout_mask_from_detections(result, height, width, args.expand, args.segmentation)
+    return statistics.median(times), len(result), mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency and mask agreement of the detection backends')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS),
+                        help='Backends to run; the first one is the IoU reference (default: all)')
+    parser.add_argument('--model-size', choices=['n', 's', 'm', 'l', 'x'], default='n',
+                        help='YOLO model size (default: n)')
+    parser.add_argument('--segmentation', action='store_true',
+                        help='Use segmentation models and masks instead of boxes')
+    for backend in BACKENDS:
+        parser.add_argument(f'--{backend}-model', metavar='PATH',
+                            help=f'Model file for the {backend} backend (default: standard name)')
+    parser.add_argument('--image', help='Benchmark on this image instead of a synthetic one')
+    parser.add_argument('--confidence', type=float, default=0.3,
+                        help='Detection confidence threshold (default: 0.3)')
+    parser.add_argument('--expand', type=int, default=50,
+                        help='Keep-out margin in pixels (default: 50)')
+    parser.add_argument('--threads', type=int,
+                        help='CPU threads per backend (default: the runtime default)')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='Timed runs per backend; the median is reported (default: 10)')
+    parser.add_argument('--output', '-o', help='Write the JSON results here instead of stdout')
+
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error('--repeat must be at least 1')
+
+    if args.image:
+        image = fit_image(load_image(args.image))
+    else:
+        image = synthetic_photo((1600, 1200))
+
+    results = {}
+    reference = None
+    # Runtimes log to stdout; keep it for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        for backend in args.backends:
+            if not backend_available(backend):
+                results[backend] = {'skipped': 'runtime not installed'}
+                continue
+            try:
+                seconds, count, mask = run_backend(backend, image, args,
+                                                   getattr(args, f'{backend}_model'))
+            except Exception as e:
+                results[backend] = {'skipped': f'{type(e).__name__}: {e}'}
+                continue
+            if reference is None:
+                reference = (backend, mask)
+            results[backend] = {
+                'seconds': round(seconds, 6),
+                'detections': count,
+                'mask_iou': round(mask_iou(reference[1], mask), 4),
+                'iou_reference': reference[0],
+            }
+            print(f'  {backend:10s} {seconds * 1000:9.1f} ms  {count:3d} objects  '
+                  f'IoU {results[backend]["mask_iou"]:.3f} vs {reference[0]}', file=sys.stderr)
+
+    report = {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'model_size': args.model_size,
+        'segmentation': args.segmentation,
+        'threads': args.threads,
+        'repeat': args.repeat,
+        'image': args.image or 'synthetic_1600x1200',
+        'backends': results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
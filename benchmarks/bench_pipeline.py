@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Benchmark the image conversion pipeline stage by stage.
+
+Synthetic photo-like JPEGs are generated at panel size (1600x1200) and at
+camera size (6000x4000, 24MP). Each pipeline stage is then timed on its own,
+in the order the converters run them:
+
+    decode      open + reduced-scale JPEG decode (eink_pipeline.decode)
+    resize      fit to the panel (eink_pipeline.pipeline.fit_image)
+    enhance     fused brightness/contrast/saturation/sharpen
+    quantize    Atkinson dither to the 6-color palette
+    palette_lut Lab LUT color mapping (prepare_eink_image.map_to_spectra, method='lut')
+    yolo        keep-out mask detection (skipped without ultralytics)
+    komap_pack  keep-out map encoding
+    write       PNG + .map output
+
+Stages with one-time setup (building the color LUT, loading the YOLO model)
+run once untimed first. Results are written as JSON: median seconds,
+megapixels per second and the process peak RSS once each stage has run.
+The peak RSS is the high-water mark of the whole process so far, so it is
+cumulative: a stage only raises it if it needs more memory than every
+earlier stage and input did. With --baseline the run is compared
+against a stored result and the script exits with status 1 if any stage got
+slower than the allowed threshold.
+
+Usage:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --output results.json --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baseline.json --threshold 0.25
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+import numpy as np
+import PIL
+from PIL import Image, ImageDraw, ImageFilter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import prepare_eink_image as preparer
+from eink_pipeline.backends import backend_available
+from eink_pipeline.dither import quantize_atkinson
+from eink_pipeline.komap import encode_keepout_map, write_keepout_map
+from eink_pipeline.pipeline import detect_keepout_mask, enhance, fit_image, load_image, quantize
+
+INPUT_SIZES = {
+    'panel_1600x1200': (1600, 1200),
+    'camera_24mp': (6000, 4000),
+}
+
+STAGES = ('decode', 'resize', 'enhance', 'quantize', 'palette_lut', 'yolo', 'komap_pack', 'write')
+
+# Stages whose first call builds cached state (color LUT, YOLO model); the
+# per-image cost is timed after one untimed call
+WARM_UP_STAGES = ('palette_lut', 'yolo')
+
+
+def synthetic_photo(size, seed=0):
+    """Deterministic photo-like RGB image: gradients, soft shapes and sensor noise."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    # Draw at a quarter of the size and scale up, like a lens-blurred scene
+    small_w, small_h = max(width // 4, 1), max(height // 4, 1)
+    y, x = np.mgrid[0:small_h, 0:small_w]
+    base = np.stack([120 + 80 * np.sin(x / (small_w / 5)),
+                     100 + 60 * np.cos(y / (small_h / 6)),
+                     140 + 50 * np.sin((x + y) / (small_w / 3))], axis=-1)
+    image = Image.fromarray(np.clip(base, 0, 255).astype(np.uint8))
+    draw = ImageDraw.Draw(image)
+    for _ in range(60):
+        x0, y0 = rng.integers(0, small_w), rng.integers(0, small_h)
+        r = rng.integers(small_w // 80 + 1, small_w // 8 + 2)
+        draw.ellipse([x0, y0, x0 + r, y0 + r], fill=tuple(int(v) for v in rng.integers(0, 256, 3)))
+    image = image.filter(ImageFilter.GaussianBlur(1)).resize(size, Image.Resampling.BICUBIC)
+    noisy = np.asarray(image, dtype=np.int16) + rng.integers(-3, 4, (height, width, 3), dtype=np.int16)
+    return Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8))
+
+
+def synthetic_mask(size, seed=0):
+    """Keep-out mask with a few filled rectangles, as detection would produce."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    mask = np.zeros((height, width), dtype=np.uint8)
+    for _ in range(5):
+        x0, y0 = rng.integers(0, width // 2), rng.integers(0, height // 2)
+        mask[y0:y0 + height // 4, x0:x0 + width // 4] = 255
+    return mask
+
+
+def peak_rss_mb():
+    """Peak resident set size of the process so far in MB, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def time_stage(func, repeat):
+    """Run func repeat times; return (median seconds, last result)."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def run_benchmarks(sizes, stages, repeat, work_dir):
+    results = {}
+
+    for name in sizes:
+        size = INPUT_SIZES[name]
+        input_path = os.path.join(work_dir, f'{name}.jpg')
+        synthetic_photo(size).save(input_path, quality=90)
+        output_base = os.path.join(work_dir, f'{name}_output')
+        panel_pixels = 1600 * 1200
+
+        decoded = load_image(input_path)
+        resized = fit_image(decoded)
+        enhanced = enhance(resized)
+        quantized = quantize(enhanced)
+        mask = synthetic_mask(resized.size)
+
+        runs = {
+            'decode': (lambda: load_image(input_path), size[0] * size[1]),
+            'resize': (lambda: fit_image(decoded), decoded.size[0] * decoded.size[1]),
+            'enhance': (lambda: enhance(resized), panel_pixels),
+            'quantize': (lambda: quantize_atkinson(enhanced), panel_pixels),
+            'palette_lut': (lambda: preparer.map_to_spectra(resized, method='lut'), panel_pixels),
+            'yolo': (lambda: detect_keepout_mask(resized), panel_pixels),
+            'komap_pack': (lambda: encode_keepout_map(mask), panel_pixels),
+            'write': (lambda: (quantized.save(output_base + '.png', optimize=True),
+                               write_keepout_map(mask, output_base + '.map')), panel_pixels),
+        }
+
+        stage_results = {}
+        for stage in stages:
+            if stage == 'yolo' and not backend_available('torch'):
+                stage_results[stage] = {'skipped': 'ultralytics/torch not installed'}
+                continue
+            func, pixels = runs[stage]
+            if stage in WARM_UP_STAGES:
+                func()
+            seconds, _ = time_stage(func, repeat)
+            stage_results[stage] = {
+                'seconds': round(seconds, 6),
+                'megapixels_per_second': round(pixels / 1e6 / seconds, 2) if seconds else None,
+                'cumulative_peak_rss_mb': round(peak_rss_mb(), 1) if resource else None,
+            }
+            print(f'  {name:16s} {stage:12s} {seconds * 1000:9.1f} ms', file=sys.stderr)
+        results[name] = stage_results
+
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold, min_delta):
+    """
+    Return a list of (input, stage, baseline s, current s) for stages that
+    got slower by more than threshold (a fraction) and min_delta seconds.
+    """
+    regressions = []
+    for name, stages in results.items():
+        for stage, current in stages.items():
+            previous = baseline.get('inputs', {}).get(name, {}).get(stage, {})
+            if 'seconds' not in current or 'seconds' not in previous:
+                continue
+            if (current['seconds'] > previous['seconds'] * (1 + threshold)
+                    and current['seconds'] - previous['seconds'] > min_delta):
+                regressions.append((name, stage, previous['seconds'], current['seconds']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-stage benchmark of the e-ink image pipeline')
+    parser.add_argument('--sizes', nargs='+', choices=list(INPUT_SIZES), default=list(INPUT_SIZES),
+                        help='Synthetic input sizes to run (default: all)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES),
+                        help='Stages to time (default: all)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per stage; the median is reported (default: 3)')
+    parser.add_argument('--output', '-o', help='Write the JSON results here instead of stdout')
+    parser.add_argument('--baseline', help='Compare against this stored result and fail on regressions')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline as a fraction (default: 0.25)')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                        help='Ignore slowdowns smaller than this, for sub-millisecond stages (default: 2)')
+    parser.add_argument('--save-baseline', metavar='PATH',
+                        help='Also store this run as a baseline for later comparisons')
+
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error('--repeat must be at least 1')
+
+    # The pipeline functions print progress; keep stdout for the JSON report
+    with tempfile.TemporaryDirectory(prefix='eink_bench_') as work_dir, \
+            contextlib.redirect_stdout(sys.stderr):
+        inputs = run_benchmarks(args.sizes, args.stages, args.repeat, work_dir)
+
+    report = {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pillow': PIL.__version__,
+        'cpu_count': os.cpu_count(),
+        'repeat': args.repeat,
+        'inputs': inputs,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text + '\n')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(inputs, baseline, args.threshold, args.min_delta_ms / 1000)
+        for name, stage, before, after in regressions:
+            print(f'REGRESSION {name}/{stage}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms '
+                  f'(+{(after / before - 1) * 100:.0f}%, allowed {args.threshold * 100:.0f}%)',
+                  file=sys.stderr)
+        if regressions:
+            return 1
+        print(f'No stage regressed more than {args.threshold * 100:.0f}% against {args.baseline}',
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -54,7 +54,7 @@ bool Spectra6ColorMap::buildLUT() {
     // Free existing LUT if any
     freeLUT();
     
-    Serial.println("Building custom RGB->Spectra LUT (32KB)...");
+    Serial.printf("Building custom RGB->Spectra LUT (%luKB)...\n", (unsigned long)COLOR_LUT_TOTAL / 1024);
     uint32_t t0 = millis();
     
     // Allocate LUT - try PSRAM first, fall back to regular RAM
@@ -22,16 +22,21 @@ enum ColorMapMode {
     COLOR_MAP_LUT           // Pre-computed LUT (fastest, zero runtime cost)
 };
 
-// LUT configuration: 5 bits per channel = 32x32x32 = 32KB
-// This is optimal for 6-color output - larger LUTs offer no benefit
-#define COLOR_LUT_BITS  5
-#define COLOR_LUT_SIZE  32   // 2^5
-#define COLOR_LUT_TOTAL 32768  // 32^3
-#define COLOR_LUT_SHIFT 3    // 8 - 5
-
-// Include pre-generated PROGMEM LUT (32KB in flash, zero RAM cost)
+// Include pre-generated PROGMEM LUT (32KB in flash at the default 5 bits,
+// zero RAM cost)
 #include "EL133UF1_ColorLUT.h"
 
+// LUT configuration: bits per channel follow the generated header
+// (scripts/generate_color_lut.py --bits), default 5 = 32x32x32 = 32KB
+#ifdef SPECTRA6_COLOR_LUT_BITS
+#define COLOR_LUT_BITS  SPECTRA6_COLOR_LUT_BITS
+#else
+#define COLOR_LUT_BITS  5
+#endif
+#define COLOR_LUT_SIZE  (1 << COLOR_LUT_BITS)
+#define COLOR_LUT_TOTAL (COLOR_LUT_SIZE * COLOR_LUT_SIZE * COLOR_LUT_SIZE)
+#define COLOR_LUT_SHIFT (8 - COLOR_LUT_BITS)
+
 /**
  * @brief Spectra 6 color mapper with perceptual color matching
  */
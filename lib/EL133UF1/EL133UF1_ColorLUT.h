@@ -5,11 +5,10 @@
  * AUTO-GENERATED FILE - DO NOT EDIT MANUALLY
  * Generated by: scripts/generate_color_lut.py
  * 
- * This LUT maps 5-bit-per-channel RGB values to Spectra 6 colors
+ * Each LUT maps N-bit-per-channel RGB values to Spectra 6 colors
  * using CIE Lab perceptual color matching.
  * 
- * Size: 32KB (32x32x32)
- * 5-bit is optimal - larger LUTs offer no benefit for 6-color output
+ * SPECTRA6_COLOR_LUT: 5-bit, 32x32x32 = 32768 bytes (default palette)
  */
 
 #ifndef EL133UF1_COLORLUT_H
@@ -17,6 +16,8 @@
 
 #include <Arduino.h>
 
+#define SPECTRA6_COLOR_LUT_BITS 5
+
 // Store in flash (PROGMEM) to save RAM
 static const uint8_t PROGMEM SPECTRA6_COLOR_LUT[32768] = {
     0, 0, 0, 0, 0, 0, 0, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5,
@@ -0,0 +1,11 @@
+"""
+Shared building blocks for the EL133UF1 image preparation scripts.
+
+convert_image_with_maps.py and prepare_eink_image.py both import from this
+package so that expensive state (YOLO models, lookup tables) and file
+formats (keep-out maps) live in one place. eink_pipeline.pipeline exposes
+the conversion stages (load, fit, enhance, quantize, detect, write) for
+calling in-process without either script.
+"""
+
+__version__ = '1.0.0'
@@ -0,0 +1,24 @@
+"""
+Detection backend names and availability checks.
+
+Kept free of NumPy and PIL so command line front ends can build their
+argument parsers and check for a runtime without importing the detection
+code (eink_pipeline.detection).
+"""
+
+import importlib.util
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+
+# Module each backend needs, and how to install it
+_BACKEND_MODULES = {'torch': 'ultralytics', 'onnx': 'onnxruntime', 'openvino': 'openvino'}
+BACKEND_REQUIREMENTS = {
+    'torch': 'pip install torch ultralytics',
+    'onnx': 'pip install onnxruntime',
+    'openvino': 'pip install openvino',
+}
+
+
+def backend_available(backend):
+    """True if the runtime for a backend is installed (without importing it)."""
+    return importlib.util.find_spec(_BACKEND_MODULES[backend]) is not None
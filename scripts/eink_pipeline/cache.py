@@ -0,0 +1,137 @@
+"""
+Content-addressed cache for converted images.
+
+Entries are keyed by a SHA-256 of the input file bytes plus every parameter
+that affects the output, so an unchanged photo converted with unchanged
+settings maps to the same entry no matter where it lives or what it is
+called. Each entry is a directory holding the output files by suffix:
+
+    <cache_dir>/<key[:2]>/<key>/out.png
+    <cache_dir>/<key[:2]>/<key>/out.map
+
+Hits copy the stored files next to the output base name. Entries are made
+visible with a single rename, so several worker processes can share one
+cache directory. The entry directory mtime records the last use, and
+prune() evicts least recently used entries until the cache fits its cap.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# Bump when a pipeline change alters output for the same input and settings
+CACHE_VERSION = 3  # 3: reduced-scale JPEG/HEIF decoding
+
+DEFAULT_CACHE_MAX_MB = 2048
+
+_ENTRY_PREFIX = 'out'
+_CHUNK_SIZE = 1 << 20
+
+
+def cache_key(input_path, params):
+    """Hash of the input file contents and a JSON-serializable params dict."""
+    h = hashlib.sha256()
+    h.update(json.dumps({'version': CACHE_VERSION, 'params': params},
+                        sort_keys=True).encode('utf-8'))
+    with open(input_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ConversionCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def fetch(self, key, output_base):
+        """
+        Copy the outputs stored under key to output_base + suffix.
+
+        Returns the list of written paths, or None on a miss.
+        """
+        entry = self._entry_dir(key)
+        try:
+            names = os.listdir(entry)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        written = []
+        for name in names:
+            suffix = name[len(_ENTRY_PREFIX):]
+            dest = output_base + suffix
+            shutil.copyfile(os.path.join(entry, name), dest)
+            written.append(dest)
+        os.utime(entry)  # mark as recently used
+        self.hits += 1
+        return written
+
+    def store(self, key, output_paths):
+        """Add the given output files (named base + suffix) under key."""
+        entry = self._entry_dir(key)
+        if os.path.isdir(entry):
+            return
+        parent = os.path.dirname(entry)
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+        try:
+            for path in output_paths:
+                suffix = os.path.splitext(path)[1]
+                shutil.copyfile(path, os.path.join(tmp, _ENTRY_PREFIX + suffix))
+            os.rename(tmp, entry)
+        except OSError:
+            # Another process stored the same entry first, or the copy failed
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _entries(self):
+        """Yield (mtime, size, path) for every complete entry."""
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith('.tmp-') or not entry.is_dir():
+                    continue
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                yield entry.stat().st_mtime, size, entry.path
+
+    def prune(self):
+        """Evict least recently used entries until the cache fits max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def stats(self):
+        """Entry count and total size of the cache plus this run's hit/miss counts."""
+        entries = list(self._entries())
+        return {
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+def format_cache_stats(stats):
+    """One-line human readable summary of ConversionCache.stats()."""
+    lookups = stats['hits'] + stats['misses']
+    hit_rate = 100.0 * stats['hits'] / lookups if lookups else 0.0
+    return (f"Cache: {stats['entries']} entries, "
+            f"{stats['bytes'] / (1024 * 1024):.1f} MB of {stats['max_bytes'] / (1024 * 1024):.0f} MB, "
+            f"{stats['hits']} hits / {stats['misses']} misses ({hit_rate:.0f}% hit rate)")
@@ -0,0 +1,60 @@
+"""
+Reduced-scale decoding of large photos.
+
+A 24MP camera JPEG only needs about 1/4 of its resolution to fill a
+1600x1200 panel. Image.draft() lets the JPEG decoder scale by 1/2, 1/4 or
+1/8 in the DCT domain, and pillow-heif uses it to pick an embedded HEIF
+thumbnail, so the full-size image is never decoded or held in memory.
+Formats without a reduced decode path ignore the request.
+"""
+
+import math
+
+_heif_registered = None
+
+
+def draft_size(size, target_size, fit='cover'):
+    """
+    Smallest decode size that still resizes to target_size without upscaling.
+
+    fit='cover' scales the image to fill the target (cropping the excess),
+    fit='contain' scales it to fit inside (padding the rest). Returns None
+    if the image is not larger than needed.
+    """
+    width, height = size
+    target_width, target_height = target_size
+    ratios = (target_width / width, target_height / height)
+    ratio = max(ratios) if fit == 'cover' else min(ratios)
+    if ratio >= 1:
+        return None
+    return math.ceil(width * ratio), math.ceil(height * ratio)
+
+
+def draft_for_target(image, target_size, fit='cover'):
+    """
+    Configure a freshly opened (not yet loaded) image to decode at the
+    smallest scale that still covers what target_size needs (see
+    draft_size). Afterwards image.size reports the reduced size; the aspect
+    ratio is unchanged. Returns the image.
+    """
+    size = draft_size(image.size, target_size, fit)
+    if size is not None:
+        image.draft(None, size)
+    return image
+
+
+def register_heif_opener():
+    """
+    Let PIL open HEIC/HEIF files through pillow-heif, importing it on first
+    use. Returns False if pillow-heif is not installed.
+    """
+    global _heif_registered
+    if _heif_registered is None:
+        try:
+            import pillow_heif
+        except ImportError:
+            _heif_registered = False
+        else:
+            pillow_heif.register_heif_opener()
+            _heif_registered = True
+    return _heif_registered
@@ -0,0 +1,338 @@
+"""
+Object detection backends for keep-out maps.
+
+Every backend is a Detector: it takes RGB PIL images and returns one
+Detections per image with the same structure, so keep-out mask
+construction does not care which runtime produced them:
+
+    torch     ultralytics YOLOv8 on PyTorch (.pt weights)
+    onnx      YOLOv8 exported to ONNX, run with ONNX Runtime on the CPU
+    openvino  YOLOv8 exported to OpenVINO IR (typically INT8-quantized)
+
+The exported backends run the YOLOv8 head decoding, NMS and mask assembly
+here in NumPy, so they need neither torch nor ultralytics at runtime.
+Models are always loaded from local files. Only the torch backend downloads
+missing default weights, through ultralytics. Use
+export_detection_model.py to produce the ONNX/OpenVINO files once.
+"""
+
+import abc
+import ast
+import os
+
+import numpy as np
+from PIL import Image
+
+from eink_pipeline.backends import BACKEND_REQUIREMENTS, backend_available
+from eink_pipeline.models import get_model, model_name
+
+# YOLOv8 export defaults (ultralytics predict settings)
+INPUT_SIZE = 640
+LETTERBOX_FILL = 114
+NMS_IOU = 0.7
+MAX_DETECTIONS = 300
+MASK_COEFFICIENTS = 32
+
+# Offset that keeps boxes of different classes apart for class-aware NMS
+_CLASS_OFFSET = 7680
+
+
+class Detections:
+    """
+    Detections for one image.
+
+    boxes are (N, 4) xyxy in input image pixels, scores (N,), classes (N,)
+    int class ids and names maps class id to label. masks is None for
+    detection-only models, else (N, mh, mw) instance masks covering exactly
+    the image area at model resolution, letterbox padding removed (values
+    > 0.5 are inside).
+    """
+
+    def __init__(self, boxes, scores, classes, names, masks=None):
+        self.boxes = boxes
+        self.scores = scores
+        self.classes = classes
+        self.names = names
+        self.masks = masks
+
+    def __len__(self):
+        return len(self.boxes)
+
+
+class Detector(abc.ABC):
+    """Interface shared by every backend's detector; names maps class id to label."""
+
+    names = None
+
+    @abc.abstractmethod
+    def detect(self, images, confidence):
+        """Detect objects in a list of RGB PIL images; returns one Detections per image."""
+
+
+def default_model_path(backend, model_size='n', segmentation=False):
+    """Where export_detection_model.py (and ultralytics) put a model by default."""
+    weights = model_name(model_size, segmentation)
+    stem = os.path.splitext(weights)[0]
+    if backend == 'onnx':
+        return stem + '.onnx'
+    if backend == 'openvino':
+        return os.path.join(f'{stem}_int8_openvino_model', stem + '.xml')
+    return weights
+
+
+class TorchDetector(Detector):
+    def __init__(self, model_size='n', segmentation=False, model_path=None, threads=None):
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = get_model(model_size, segmentation=segmentation, model_path=model_path)
+        self.names = self.model.names
+
+    def detect(self, images, confidence):
+        # One inference call for the whole batch; results come back in input order
+        results = self.model(list(images), conf=confidence, verbose=False)
+        detections = []
+        for image, result in zip(images, results):
+            boxes = result.boxes
+            masks = None
+            if result.masks is not None:
+                # A batch of mixed sizes is padded to a common square, so
+                # the masks include padding that this image does not have
+                masks = remove_letterbox_padding(result.masks.data.cpu().numpy(), image.size)
+            detections.append(Detections(
+                boxes.xyxy.cpu().numpy(),
+                boxes.conf.cpu().numpy(),
+                boxes.cls.cpu().numpy().astype(int),
+                self.names,
+                masks
+            ))
+        return detections
+
+
+def remove_letterbox_padding(masks, image_size):
+    """
+    Crop (N, mh, mw) masks of a letterboxed input to the area showing the
+    image, using the same centered padding as letterbox() and ultralytics.
+    """
+    mask_h, mask_w = masks.shape[1:]
+    width, height = image_size
+    gain = min(mask_w / width, mask_h / height)
+    new_w, new_h = round(width * gain), round(height * gain)
+    left = round((mask_w - new_w) / 2 - 0.1)
+    top = round((mask_h - new_h) / 2 - 0.1)
+    return masks[:, top:top + new_h, left:left + new_w]
+
+
+def letterbox(image, size):
+    """
+    Scale an RGB image to fit size x size, centered on grey padding like the
+    ultralytics LetterBox transform. Returns the (1, 3, size, size) float32
+    blob, the scale factor and the (left, top) padding.
+    """
+    width, height = image.size
+    gain = min(size / width, size / height)
+    new_w, new_h = round(width * gain), round(height * gain)
+    left = round((size - new_w) / 2 - 0.1)
+    top = round((size - new_h) / 2 - 0.1)
+
+    canvas = Image.new('RGB', (size, size), (LETTERBOX_FILL,) * 3)
+    canvas.paste(image.convert('RGB').resize((new_w, new_h), Image.Resampling.BILINEAR), (left, top))
+    blob = np.asarray(canvas, dtype=np.float32).transpose(2, 0, 1)[np.newaxis] / np.float32(255)
+    return np.ascontiguousarray(blob), gain, (left, top)
+
+
+def non_max_suppression(boxes, scores, iou_threshold=NMS_IOU, max_detections=MAX_DETECTIONS):
+    """Greedy NMS over xyxy boxes; returns kept indices by descending score."""
+    order = np.argsort(-scores)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size and len(keep) < max_detections:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        xx1 = np.maximum(boxes[best, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[best, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[best, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[best, 3], boxes[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[best] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def decode_yolo_output(outputs, confidence, gain, pad, image_size, names, input_size=INPUT_SIZE):
+    """
+    Turn raw YOLOv8 outputs into Detections.
+
+    outputs[0] is (1, 4 + classes [+ 32], anchors); segmentation models add
+    outputs[1], the (1, 32, mh, mw) mask prototypes.
+    """
+    prediction = outputs[0][0].T
+    protos = outputs[1][0] if len(outputs) > 1 else None
+    num_classes = prediction.shape[1] - 4 - (MASK_COEFFICIENTS if protos is not None else 0)
+
+    class_scores = prediction[:, 4:4 + num_classes]
+    classes = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(classes)), classes]
+    candidates = scores > confidence
+    prediction, classes, scores = prediction[candidates], classes[candidates], scores[candidates]
+
+    cx, cy, bw, bh = prediction[:, 0], prediction[:, 1], prediction[:, 2], prediction[:, 3]
+    boxes = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+    keep = non_max_suppression(boxes + (classes * _CLASS_OFFSET)[:, None], scores)
+    boxes, classes, scores, prediction = boxes[keep], classes[keep], scores[keep], prediction[keep]
+
+    masks = None
+    if protos is not None and len(keep):
+        masks = _assemble_masks(prediction[:, 4 + num_classes:], protos, boxes, gain, pad,
+                                image_size, input_size)
+
+    # Letterboxed input coordinates -> image pixels
+    width, height = image_size
+    left, top = pad
+    boxes = (boxes - np.array([left, top, left, top], dtype=boxes.dtype)) / gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+
+    return Detections(boxes, scores, classes.astype(int), names, masks)
+
+
+def _assemble_masks(coefficients, protos, boxes, gain, pad, image_size, input_size):
+    """Instance masks (N, new_h, new_w) covering the image area of the letterboxed input."""
+    channels, proto_h, proto_w = protos.shape
+    logits = coefficients @ protos.reshape(channels, -1)
+    masks = (1 / (1 + np.exp(-logits))).reshape(-1, proto_h, proto_w).astype(np.float32)
+
+    # Zero everything outside each box (in prototype coordinates)
+    scale = np.array([proto_w, proto_h, proto_w, proto_h], dtype=np.float32) / input_size
+    x1, y1, x2, y2 = (boxes * scale).T[:, :, None, None]
+    cols = np.arange(proto_w, dtype=np.float32)[None, None, :]
+    rows = np.arange(proto_h, dtype=np.float32)[None, :, None]
+    masks *= (cols >= x1) & (cols < x2) & (rows >= y1) & (rows < y2)
+
+    # Upsample to the input size, threshold, and cut away the padding
+    width, height = image_size
+    left, top = pad
+    new_w, new_h = round(width * gain), round(height * gain)
+    out = np.empty((len(masks), new_h, new_w), dtype=bool)
+    for i, mask in enumerate(masks):
+        full = Image.fromarray(mask).resize((input_size, input_size), Image.Resampling.BILINEAR)
+        out[i] = np.asarray(full)[top:top + new_h, left:left + new_w] > 0.5
+    return out
+
+
+def _names_from_metadata(value):
+    """Class names from an exported model's 'names' metadata string."""
+    try:
+        return {int(k): v for k, v in ast.literal_eval(value).items()}
+    except (ValueError, SyntaxError, AttributeError):
+        return None
+
+
+class _ExportedYoloDetector(Detector):
+    """Shared pre/post-processing for exported YOLOv8 models (batch size 1)."""
+
+    input_size = INPUT_SIZE
+
+    def detect(self, images, confidence):
+        detections = []
+        for image in images:
+            blob, gain, pad = letterbox(image, self.input_size)
+            outputs = self._infer(blob)
+            detections.append(decode_yolo_output(outputs, confidence, gain, pad, image.size,
+                                                 self.names, self.input_size))
+        return detections
+
+    @abc.abstractmethod
+    def _infer(self, blob):
+        """Run the model on a letterboxed (1, 3, S, S) blob; returns its raw outputs."""
+
+
+class OnnxDetector(_ExportedYoloDetector):
+    def __init__(self, model_size='n', segmentation=False, model_path=None, threads=None):
+        import onnxruntime
+
+        path = model_path or default_model_path('onnx', model_size, segmentation)
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        shape = self.session.get_inputs()[0].shape
+        if isinstance(shape[-1], int):
+            self.input_size = shape[-1]
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = _names_from_metadata(metadata.get('names', '')) or {}
+
+    def _infer(self, blob):
+        return self.session.run(None, {self.input_name: blob})
+
+
+class OpenVinoDetector(_ExportedYoloDetector):
+    def __init__(self, model_size='n', segmentation=False, model_path=None, threads=None):
+        import openvino
+
+        path = model_path or default_model_path('openvino', model_size, segmentation)
+        if os.path.isdir(path):
+            xml_files = [f for f in os.listdir(path) if f.endswith('.xml')]
+            if not xml_files:
+                raise FileNotFoundError(f'No OpenVINO .xml model in {path}')
+            path = os.path.join(path, xml_files[0])
+        core = openvino.Core()
+        model = core.read_model(path)
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if threads:
+            config['INFERENCE_NUM_THREADS'] = threads
+        self.compiled = core.compile_model(model, 'CPU', config)
+        shape = model.inputs[0].get_partial_shape()
+        if shape[-1].is_static:
+            self.input_size = shape[-1].get_length()
+        self.names = self._read_names(os.path.dirname(path)) or {}
+
+    @staticmethod
+    def _read_names(directory):
+        """Class names from the metadata.yaml ultralytics writes next to the IR."""
+        metadata = os.path.join(directory, 'metadata.yaml')
+        if not os.path.exists(metadata):
+            return None
+        # Read the 'names:' mapping by hand to avoid requiring PyYAML
+        names = {}
+        with open(metadata) as f:
+            in_names = False
+            for line in f:
+                if not line.startswith((' ', '\t')):
+                    in_names = line.strip() == 'names:'
+                    continue
+                if in_names and ':' in line:
+                    key, value = line.split(':', 1)
+                    if key.strip().isdigit():
+                        names[int(key)] = value.strip().strip('\'"')
+        return names
+
+    def _infer(self, blob):
+        results = self.compiled([blob])
+        return [results[output] for output in self.compiled.outputs]
+
+
+_DETECTOR_CLASSES = {'torch': TorchDetector, 'onnx': OnnxDetector, 'openvino': OpenVinoDetector}
+
+_detectors = {}
+
+
+def get_detector(backend='torch', model_size='n', segmentation=False, model_path=None, threads=None):
+    """
+    Return the shared detector for a backend and model, loading it on first use.
+
+    Raises ImportError if the backend's runtime is not installed and
+    propagates any error from loading the model.
+    """
+    if backend not in _DETECTOR_CLASSES:
+        raise ValueError(f'Unknown detection backend: {backend}')
+    if not backend_available(backend):
+        raise ImportError(f'{backend} backend requires: {BACKEND_REQUIREMENTS[backend]}')
+    key = (backend, model_size, bool(segmentation), model_path)
+    detector = _detectors.get(key)
+    if detector is None:
+        detector = _DETECTOR_CLASSES[backend](model_size, segmentation, model_path, threads)
+        _detectors[key] = detector
+    return detector
@@ -0,0 +1,154 @@
+"""
+Streaming discovery of input images.
+
+iter_image_files() walks directories with os.scandir and yields each image
+as soon as it is found, so callers can start converting while a large tree
+(e.g. a network share) is still being listed. Candidates are picked by
+extension and then confirmed by their first bytes, so a truncated download
+or a mislabelled file is skipped up front instead of failing in a worker.
+"""
+
+import glob
+import os
+import re
+import sys
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tiff', '.tif', '.webp', '.gif', '.heic')
+
+# ISO BMFF brands of HEIF/HEIC still images
+_HEIF_BRANDS = (b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'mif1', b'msf1')
+
+_SNIFF_BYTES = 16
+
+_GLOB_CHARS = re.compile(r'[*?[]')
+
+
+def sniff_image_type(path):
+    """Image type from the file's magic bytes ('jpeg', 'png', ...) or None."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(_SNIFF_BYTES)
+    except OSError:
+        return None
+
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return 'gif'
+    if head.startswith((b'II*\x00', b'MM\x00*')):
+        return 'tiff'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[4:8] == b'ftyp' and head[8:12] in _HEIF_BRANDS:
+        return 'heif'
+    return None
+
+
+def _pil_can_open(path):
+    """True if PIL recognises the file, for formats sniff_image_type() does not know."""
+    from PIL import Image
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        return False
+    return True
+
+
+def iter_image_files(paths, extensions=IMAGE_EXTENSIONS, recursive=True,
+                     exclude=None, on_skip=None):
+    """
+    Yield image file paths from a list of files and directories.
+
+    Directories are walked depth first (recursively unless recursive=False);
+    hidden entries (names starting with '.', such as macOS ._ resource
+    files) are skipped and symlinked directories are not entered. Files
+    found while walking are yielded if their extension is in extensions and
+    their magic bytes match a known image type. Explicitly listed files are
+    trusted whatever their name; those that fail the magic byte check (e.g.
+    BMP) are accepted if PIL can open them. exclude(name) can reject walked
+    file names (e.g. our own outputs), and on_skip(path) is called for
+    files that are rejected as unreadable.
+    """
+    for path in paths:
+        if os.path.isfile(path):
+            if sniff_image_type(path) or _pil_can_open(path):
+                yield path
+            elif on_skip:
+                on_skip(path)
+            continue
+        if not os.path.isdir(path):
+            continue
+
+        pending = [path]
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = os.scandir(directory)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending.append(entry.path)
+                        continue
+                    if not entry.name.lower().endswith(extensions):
+                        continue
+                    if exclude and exclude(entry.name):
+                        continue
+                    if not entry.is_file():
+                        continue
+                    if sniff_image_type(entry.path):
+                        yield entry.path
+                    elif on_skip:
+                        on_skip(entry.path)
+
+
+def expand_input_paths(patterns):
+    """
+    Resolve command line inputs to existing files and directories.
+
+    Inputs that exist are kept as given; others are expanded as glob
+    patterns (with ** matching across directories), for shells and list
+    files that pass wildcards through. Returns (paths, missing), where
+    missing holds the inputs that matched nothing.
+    """
+    paths = []
+    missing = []
+    for pattern in patterns:
+        if os.path.exists(pattern):
+            paths.append(pattern)
+            continue
+        matches = sorted(glob.glob(pattern, recursive=True)) if _GLOB_CHARS.search(pattern) else []
+        if matches:
+            paths.extend(matches)
+        else:
+            missing.append(pattern)
+    return paths, missing
+
+
+def read_path_list(list_file):
+    """Paths from a text file (or '-' for stdin), one per line; blank lines and # comments are skipped."""
+    if list_file == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(list_file, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith('#')]
+
+
+def batched(iterable, size):
+    """Group an iterable into lists of up to size items, lazily."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
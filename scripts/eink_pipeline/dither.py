@@ -0,0 +1,139 @@
+"""
+Atkinson dithering to the 6-color e-ink palette.
+
+convert_image_with_maps.py quantizes with this palette and distance metric
+(weighted RGB plus luma, tuned for the panel). atkinson_indices() processes
+one anti-diagonal of pixels at a time, which respects the error diffusion
+order while keeping the per-pixel work vectorized.
+"""
+
+import numpy as np
+from PIL import Image
+
+# Define the 6-color palette (black, white, yellow, red, blue, green)
+PALETTE_COLORS = [
+    (0, 0, 0),        # Black
+    (255, 255, 255),  # White
+    (255, 255, 0),    # Yellow
+    (255, 0, 0),      # Red
+    (0, 0, 255),      # Blue
+    (0, 255, 0)       # Green
+]
+
+# Spectra color codes for PALETTE_COLORS entries (see EL133UF1.h)
+PALETTE_CODES = np.array([0, 1, 2, 3, 5, 6], dtype=np.uint8)
+
+# Precompute palette as NumPy arrays for faster access
+PALETTE_ARRAY = np.array(PALETTE_COLORS, dtype=np.float32)
+PALETTE_LUMA_ARRAY = np.array(
+    [r*250 + g*350 + b*400 for (r, g, b) in PALETTE_COLORS],
+    dtype=np.float32
+) / (255.0 * 1000)
+
+# Palette image for PIL quantize()
+PALETTE_IMAGE = Image.new("P", (1, 1))
+PALETTE_IMAGE.putpalette(
+    (0,0,0, 255,255,255, 255,255,0, 255,0,0, 0,0,255, 0,255,0)
+    + (0,0,0)*249
+)
+
+
+def closest_palette_color(rgb):
+    r1, g1, b1 = rgb
+    luma1 = (r1 * 250 + g1 * 350 + b1 * 400) / (255.0 * 1000)
+
+    diffR = r1 - PALETTE_ARRAY[:, 0]
+    diffG = g1 - PALETTE_ARRAY[:, 1]
+    diffB = b1 - PALETTE_ARRAY[:, 2]
+
+    rgb_dist = (diffR*diffR*0.250 + diffG*diffG*0.350 + diffB*diffB*0.400) * 0.75 / (255.0*255.0)
+    luma_diff = luma1 - PALETTE_LUMA_ARRAY
+    luma_dist = luma_diff * luma_diff
+
+    total_dist = 1.5*rgb_dist + 0.60*luma_dist
+    return np.argmin(total_dist)
+
+
+# Dtype closest_palette_color() ends up computing distances in: NumPy 2
+# promotes the int64 pixel scalars to float64, older NumPy stays in float32.
+# The tables below follow suit so both paths produce identical indices.
+_DIST_DTYPE = np.result_type(np.int64(0), PALETTE_ARRAY)
+
+
+def _build_distance_tables():
+    """Per-channel and per-luma distance terms for every 8-bit input value."""
+    d = _DIST_DTYPE.type
+    levels = np.arange(256, dtype=_DIST_DTYPE)[:, np.newaxis]
+    palette = PALETTE_ARRAY.astype(_DIST_DTYPE)
+    channel_terms = []
+    for c, weight in enumerate((0.250, 0.350, 0.400)):
+        diff = levels - palette[:, c]
+        channel_terms.append(diff*diff*d(weight))
+
+    # r*250 + g*350 + b*400 is always a multiple of 50
+    luma = (np.arange(5101) * 50 / (255.0 * 1000)).astype(_DIST_DTYPE)[:, np.newaxis]
+    luma_diff = luma - PALETTE_LUMA_ARRAY.astype(_DIST_DTYPE)
+    luma_terms = d(0.60)*(luma_diff * luma_diff)
+    return channel_terms, luma_terms
+
+
+(_DIST_R, _DIST_G, _DIST_B), _DIST_LUMA = _build_distance_tables()
+
+
+def closest_palette_indices(rgb):
+    """Vectorized closest_palette_color() for an (N, 3) int array of pixels."""
+    d = _DIST_DTYPE.type
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    rgb_dist = (_DIST_R[r] + _DIST_G[g] + _DIST_B[b]) * d(0.75) / d(255.0*255.0)
+    total_dist = d(1.5)*rgb_dist + _DIST_LUMA[r*5 + g*7 + b*8]
+    return np.argmin(total_dist, axis=1)
+
+
+def atkinson_indices(img_array):
+    """
+    Atkinson-dither an (H, W, 3) uint8 array, returning (H, W) palette indices.
+
+    Error is pushed right (1/8), down-left (1/8), down (1/4) and down-right
+    (1/8), so pixel (y, x) only depends on pixels with a smaller
+    t = x + 2*y and every pixel on one such diagonal can be quantized at
+    once. Incoming errors are summed in the
+    same order the raster-scan version applied them, which keeps the float32
+    results (and thus the chosen colors) bit-identical.
+    """
+    height, width, _ = img_array.shape
+    source = img_array.astype(np.float32)
+    indices = np.empty((height, width), dtype=np.uint8)
+    rows = np.arange(height)
+
+    # Quantization error / 8 of the last four diagonals, indexed by y + 1 so
+    # that row -1 reads as the zero pad in slot row 0.
+    eighths = np.zeros((4, height + 1, 3), dtype=np.float32)
+
+    for t in range(width + 2 * (height - 1)):
+        y0 = max(0, (t - width + 2) // 2)
+        y1 = min(height, t // 2 + 1)
+        ys = rows[y0:y1]
+        xs = t - 2 * ys
+
+        prev1 = eighths[(t - 1) % 4]
+        value = source[ys, xs]
+        value += eighths[(t - 3) % 4][y0:y1]     # from (y-1, x-1)
+        value += eighths[(t - 2) % 4][y0:y1] * 2  # from (y-1, x)
+        value += prev1[y0:y1]                     # from (y-1, x+1)
+        value += prev1[y0 + 1:y1 + 1]             # from (y, x-1)
+
+        idx = closest_palette_indices(np.clip(value, 0, 255).astype(np.int64))
+        indices[ys, xs] = idx
+
+        current = eighths[t % 4]
+        current.fill(0)
+        current[y0 + 1:y1 + 1] = (value - PALETTE_ARRAY[idx]) * (1/8)
+
+    return indices
+
+
+def quantize_atkinson(image):
+    """Atkinson-dither an image to the palette, returned as an RGB image."""
+    img_array = np.array(image.convert('RGB'))
+    indices = atkinson_indices(img_array)
+    return Image.fromarray(PALETTE_ARRAY.astype(np.uint8)[indices])
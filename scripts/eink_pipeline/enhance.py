@@ -0,0 +1,159 @@
+"""
+Fused brightness/contrast/saturation and sharpening stage.
+
+The converter used to run ImageEnhance.Brightness, Contrast and Color and
+then the EDGE_ENHANCE, SMOOTH and SHARPEN filters as six full-frame passes.
+enhance_image() produces the same pixels with less work:
+
+- Brightness and contrast are per-channel maps, so they fold into a single
+  256-entry lookup table, built with PIL's own blend so the rounding and
+  clipping match. Contrast needs the mean luma after the brightness step;
+  it comes from one L histogram instead of two full RGB passes.
+- Saturation is ImageEnhance.Color, as in the chain.
+- Every 3x3 kernel in the filter chain has the form a*identity + b*box,
+  where box is the 3x3 sum. Each pass is evaluated with separable box sums
+  in float32 over cache-sized row bands, so the frame is read and written
+  once for all three filters instead of once per filter. Every pass still
+  rounds, clips and keeps the outermost pixels the way Image.filter()
+  does, so edges and noise come out exactly as in the chain.
+"""
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+DEFAULT_KERNELS = (ImageFilter.EDGE_ENHANCE, ImageFilter.SMOOTH, ImageFilter.SHARPEN)
+
+_RAMP = Image.frombytes('L', (256, 1), bytes(range(256)))
+
+# Rows per band of the combined convolution (fastest on a 2MB L2 cache)
+FILTER_BAND_ROWS = 16
+
+
+def enhance_image_chain(image, brightness=1.0, contrast=1.0, saturation=1.0,
+                        kernels=DEFAULT_KERNELS):
+    """Reference implementation: the enhancers and filters applied one by one."""
+    enhanced = ImageEnhance.Brightness(image).enhance(brightness)
+    enhanced = ImageEnhance.Contrast(enhanced).enhance(contrast)
+    enhanced = ImageEnhance.Color(enhanced).enhance(saturation)
+    for kernel in kernels:
+        enhanced = enhanced.filter(kernel)
+    return enhanced
+
+
+def tone_lut(image, brightness, contrast):
+    """
+    256-entry table applying Brightness then Contrast to each channel of an
+    RGB image.
+
+    Contrast blends towards the rounded mean of the brightened image's luma,
+    so that mean is taken from the L histogram of the brightened image,
+    exactly as ImageEnhance.Contrast computes it.
+    """
+    bright = ImageEnhance.Brightness(_RAMP).enhance(brightness)
+    bright_values = np.frombuffer(bright.tobytes(), dtype=np.uint8)
+
+    luma = image.point(np.tile(bright_values, 3).tolist()).convert('L')
+    counts = np.asarray(luma.histogram(), dtype=np.float64)
+    mean = int(counts @ np.arange(256) / max(counts.sum(), 1) + 0.5)
+
+    contrasted = Image.blend(Image.new('L', (256, 1), mean), _RAMP, contrast)
+    contrast_values = np.frombuffer(contrasted.tobytes(), dtype=np.uint8)
+    return contrast_values[bright_values]
+
+
+def box_kernel_weights(kernel):
+    """
+    (centre - box, box, scale) of a 3x3 identity + box kernel, so that
+    kernel * x = ((centre - box) * x + box * box3(x)) / scale. Raises
+    ValueError for other kernels.
+    """
+    size, scale, offset, weights = kernel.filterargs
+    neighbours = set(weights[:4] + weights[5:])
+    if size != (3, 3) or offset or len(neighbours) != 1:
+        raise ValueError(f'{type(kernel).__name__} is not a 3x3 identity + box kernel')
+    box = neighbours.pop()
+    return weights[4] - box, box, scale
+
+
+def _box3(a, out, tmp):
+    """3x3 box sum of an (H, W, C) float array into out, replicating edges."""
+    # Rows: tmp[i] = a[i-1] + a[i] + a[i+1]
+    np.add(a[1:], a[:-1], out=tmp[1:])
+    tmp[1:-1] += a[2:]
+    tmp[-1] += a[-1]
+    np.add(a[0], a[0], out=tmp[0])
+    tmp[0] += a[1]
+    # Columns
+    np.add(tmp[:, 1:], tmp[:, :-1], out=out[:, 1:])
+    out[:, 1:-1] += tmp[:, 2:]
+    out[:, -1] += tmp[:, -1]
+    np.add(tmp[:, 0], tmp[:, 0], out=out[:, 0])
+    out[:, 0] += tmp[:, 1]
+    return out
+
+
+def apply_box_kernels(rgb, kernels, band_rows=FILTER_BAND_ROWS):
+    """
+    Filter an (H, W, 3) uint8 array with a chain of identity + box kernels.
+
+    Works through row bands with a halo of one row per kernel, so the
+    float32 scratch buffers stay in cache. Each pass clips, rounds and
+    keeps the outermost pixels like Image.filter(), so the result is
+    identical to filtering the whole frame kernel by kernel with PIL.
+    """
+    height = rgb.shape[0]
+    passes = [box_kernel_weights(kernel) for kernel in kernels]
+    halo = len(passes)
+    out = np.empty_like(rgb)
+    x, acc, boxed, tmp = (np.empty((band_rows + 2 * halo,) + rgb.shape[1:], dtype=np.float32)
+                          for _ in range(4))
+
+    for start in range(0, height, band_rows):
+        stop = min(start + band_rows, height)
+        src_start, src_stop = max(start - halo, 0), min(stop + halo, height)
+        rows = src_stop - src_start
+        xb, accb, boxedb, tmpb = x[:rows], acc[:rows], boxed[:rows], tmp[:rows]
+
+        xb[...] = rgb[src_start:src_stop]
+        for identity, box, scale in passes:
+            # Integer-valued sums are exact in float32; a single division
+            # then rounds like PIL's floating point kernel
+            _box3(xb, boxedb, tmpb)
+            np.multiply(xb, np.float32(identity), out=accb)
+            boxedb *= np.float32(box)
+            accb += boxedb
+            accb /= np.float32(scale)
+            accb += 0.5
+            np.floor(accb, out=accb)
+            np.clip(accb, 0, 255, out=accb)
+            # PIL leaves the outermost pixels of each filtered image untouched
+            accb[:, 0], accb[:, -1] = xb[:, 0], xb[:, -1]
+            if src_start == 0:
+                accb[0] = xb[0]
+            if src_stop == height:
+                accb[-1] = xb[-1]
+            xb, accb = accb, xb
+        out[start:stop] = xb[start - src_start:stop - src_start]
+
+    return out
+
+
+def enhance_image(image, brightness=1.0, contrast=1.0, saturation=1.0,
+                  kernels=DEFAULT_KERNELS):
+    """
+    Fused equivalent of enhance_image_chain() for RGB images: one lookup
+    table pass for brightness and contrast, the saturation blend, and the
+    filters run band by band. The output is identical to the chain.
+    """
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    lut = tone_lut(image, brightness, contrast)
+    toned = image.point(np.tile(lut, 3).tolist())
+    if saturation != 1.0:
+        toned = ImageEnhance.Color(toned).enhance(saturation)
+    if not kernels or min(toned.size) < 3:
+        return toned  # Image.filter() leaves images this small unchanged
+
+    rgb = np.asarray(toned)
+    return Image.fromarray(apply_box_kernels(rgb, kernels))
@@ -0,0 +1,101 @@
+"""
+Native Spectra 6 framebuffer files (.s6).
+
+Stores already-mapped Spectra color codes (0-6) as packed 4bpp nibbles so
+the device can copy them straight into its framebuffer instead of
+decoding and color-mapping a PNG/BMP at display time.
+
+File format:
+    Header (16 bytes):
+        - Magic: "S6FB" (4 bytes)
+        - Version: uint8 (1 byte) - currently 1
+        - Layout: uint8 (1 byte) - 0 = rows, 1 = panel
+        - Width: uint16 LE (2 bytes) - logical image width
+        - Height: uint16 LE (2 bytes) - logical image height
+        - Flags: uint8 (1 byte) - bit 0: rotated 180°,
+                 bit 1: portrait image turned 90° clockwise
+        - Reserved: 5 bytes (for future use)
+    Data:
+        - Two pixels per byte, first pixel in the high nibble
+        - rows:  row-major logical image, (width + 1) / 2 bytes per row
+        - panel: the EL133UF1 packed/pre-rotated buffer pair; panel row
+                 = 1599 - x, panel column = y, columns 0-599 go to the
+                 CS0 half and 600-1199 to the CS1 half, each 1600 rows of
+                 300 bytes (PACKED_HALF_SIZE). A 1200x1600 portrait image
+                 is first turned 90° clockwise into the 1600x1200 panel
+                 frame (its top edge along panel x = 1599) and flag bit 1
+                 is set; the header keeps its logical 1200x1600 size.
+"""
+
+import struct
+
+import numpy as np
+
+S6_MAGIC = b'S6FB'
+S6_VERSION = 1
+
+S6_LAYOUT_ROWS = 0
+S6_LAYOUT_PANEL = 1
+
+S6_FLAG_ROTATE_180 = 0x01
+S6_FLAG_PORTRAIT = 0x02
+
+# Magic, version, layout, width, height, flags, 5 reserved bytes
+S6_HEADER = struct.Struct('<4sBBHHB5x')
+
+# Panel geometry (EL133UF1.h)
+PANEL_WIDTH = 1600
+PANEL_HEIGHT = 1200
+PANEL_HALF_COLS = 600
+
+
+def pack_nibbles(codes):
+    """Pack a 2D array of 4-bit codes along its last axis, high nibble first."""
+    codes = np.asarray(codes, dtype=np.uint8) & 0x07
+    if codes.shape[-1] % 2:
+        codes = np.concatenate([codes, np.zeros(codes.shape[:-1] + (1,), dtype=np.uint8)], axis=-1)
+    return (codes[..., 0::2] << 4) | codes[..., 1::2]
+
+
+def panel_halves(codes):
+    """
+    Rearrange a 1600x1200 (width x height) code frame into the panel's two
+    packed half buffers, exactly as EL133UF1::setPixel() fills them.
+    """
+    h, w = codes.shape
+    if (w, h) != (PANEL_WIDTH, PANEL_HEIGHT):
+        raise ValueError(f"panel layout needs a {PANEL_WIDTH}x{PANEL_HEIGHT} image, got {w}x{h}")
+    # panel[row, col] = codes[col, 1599 - row]
+    panel = codes.T[::-1]
+    return pack_nibbles(panel[:, :PANEL_HALF_COLS]), pack_nibbles(panel[:, PANEL_HALF_COLS:])
+
+
+def encode_s6(codes, panel_layout=True, rotate_180=False):
+    """Return the complete .s6 file contents for an (H, W) array of Spectra codes."""
+    codes = np.asarray(codes, dtype=np.uint8)
+    h, w = codes.shape
+    flags = 0
+    if rotate_180:
+        codes = codes[::-1, ::-1]
+        flags |= S6_FLAG_ROTATE_180
+
+    if panel_layout:
+        if (w, h) == (PANEL_HEIGHT, PANEL_WIDTH):
+            codes = np.rot90(codes, k=-1)
+            flags |= S6_FLAG_PORTRAIT
+        left, right = panel_halves(codes)
+        payload = left.tobytes() + right.tobytes()
+        layout = S6_LAYOUT_PANEL
+    else:
+        payload = pack_nibbles(codes).tobytes()
+        layout = S6_LAYOUT_ROWS
+
+    return S6_HEADER.pack(S6_MAGIC, S6_VERSION, layout, w, h, flags) + payload
+
+
+def write_s6(codes, output_path, panel_layout=True, rotate_180=False):
+    """Write Spectra codes as a .s6 framebuffer file. Returns the byte count."""
+    data = encode_s6(codes, panel_layout, rotate_180)
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return len(data)
@@ -0,0 +1,48 @@
+"""
+Keep-out map (KOMAP) file format.
+
+File format:
+    Header (16 bytes):
+        - Magic: "KOMAP" (5 bytes)
+        - Version: uint8 (1 byte) - currently 1
+        - Width: uint16 LE (2 bytes)
+        - Height: uint16 LE (2 bytes)
+        - Reserved: 6 bytes (for future use)
+    Data:
+        - Bitmap: (width * height + 7) / 8 bytes (1 bit per pixel)
+        - 1 = keep out, 0 = safe for text
+
+Pixels are stored row-major, MSB first within each byte, and only the end
+of the whole bitmap is padded to a byte boundary. This is the layout
+TextPlacementAnalyzer::loadKeepOutMap() reads on the device.
+"""
+
+import struct
+
+import numpy as np
+
+KOMAP_MAGIC = b'KOMAP'
+KOMAP_VERSION = 1
+
+# Magic, version, width, height, 6 reserved bytes
+KOMAP_HEADER = struct.Struct('<5sBHH6x')
+
+
+def pack_keepout_bitmap(keep_out_mask):
+    """Pack a (height, width) mask (nonzero = keep out) into KOMAP bitmap bytes."""
+    return np.packbits(np.asarray(keep_out_mask).ravel() > 0).tobytes()
+
+
+def encode_keepout_map(keep_out_mask):
+    """Return the complete KOMAP file contents (header + bitmap) for a mask."""
+    h, w = keep_out_mask.shape
+    header = KOMAP_HEADER.pack(KOMAP_MAGIC, KOMAP_VERSION, w, h)
+    return header + pack_keepout_bitmap(keep_out_mask)
+
+
+def write_keepout_map(keep_out_mask, output_path):
+    """Write a mask as a KOMAP file in a single write call. Returns the byte count."""
+    data = encode_keepout_map(keep_out_mask)
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return len(data)
@@ -0,0 +1,50 @@
+"""
+Process-wide YOLO model registry.
+
+Constructing a YOLO model re-reads the weights and rebuilds the network,
+which dominates runtime when keep-out maps are generated for a whole
+directory. Models are loaded once per weights file, warmed up
+with a dummy inference and then reused for every image in the process.
+"""
+
+import numpy as np
+
+# Input used to warm a freshly loaded model (first inference pays for
+# layer fusion and allocator setup)
+WARMUP_SIZE = 640
+
+_models = {}
+
+
+def model_name(model_size='n', segmentation=False):
+    """Weights file for a model size (n, s, m, l, x) and type."""
+    return f'yolov8{model_size}-seg.pt' if segmentation else f'yolov8{model_size}.pt'
+
+
+def get_model(model_size='n', segmentation=False, warmup=True, model_path=None):
+    """
+    Return the shared YOLO model for (model_size, segmentation), or for a
+    local weights file if model_path is given.
+
+    The first call loads and warms the model; later calls return the same
+    instance. Raises ImportError if ultralytics is not installed and
+    propagates any error from loading the weights.
+    """
+    key = model_path or model_name(model_size, segmentation)
+    model = _models.get(key)
+    if model is None:
+        # Imported here: ultralytics pulls in torch, which takes seconds
+        try:
+            from ultralytics import YOLO
+        except ImportError:
+            raise ImportError("ultralytics is required for object detection")
+        model = YOLO(key)
+        if warmup:
+            model(np.zeros((WARMUP_SIZE, WARMUP_SIZE, 3), dtype=np.uint8), verbose=False)
+        _models[key] = model
+    return model
+
+
+def clear_models():
+    """Drop all cached models (e.g. to free memory after a batch)."""
+    _models.clear()
@@ -0,0 +1,115 @@
+"""
+CIE Lab nearest-color search over a palette.
+
+Shared by generate_color_lut.py, which writes the firmware's RGB→palette
+tables, and eink_pipeline.palette_lut, which builds the same tables for
+host-side mapping. rgb_to_lab() is the scalar reference; the array
+functions reproduce it exactly so both paths pick the same palette entry.
+NumPy is optional: without it only the scalar functions are available.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Pre-computed sRGB to linear LUT
+srgb_to_linear = []
+for i in range(256):
+    v = i / 255.0
+    if v > 0.04045:
+        srgb_to_linear.append(((v + 0.055) / 1.055) ** 2.4)
+    else:
+        srgb_to_linear.append(v / 12.92)
+
+
+def rgb_to_lab(r, g, b):
+    """Convert RGB to CIE Lab color space."""
+    # sRGB to linear RGB
+    rf = srgb_to_linear[r]
+    gf = srgb_to_linear[g]
+    bf = srgb_to_linear[b]
+    
+    # Linear RGB to XYZ
+    x = rf * 0.4124564 + gf * 0.3575761 + bf * 0.1804375
+    y = rf * 0.2126729 + gf * 0.7151522 + bf * 0.0721750
+    z = rf * 0.0193339 + gf * 0.1191920 + bf * 0.9503041
+    
+    # Normalize for D65 white point
+    x /= 0.95047
+    y /= 1.00000
+    z /= 1.08883
+    
+    # XYZ to Lab
+    epsilon = 0.008856
+    kappa = 903.3
+    
+    fx = x ** (1/3) if x > epsilon else (kappa * x + 16.0) / 116.0
+    fy = y ** (1/3) if y > epsilon else (kappa * y + 16.0) / 116.0
+    fz = z ** (1/3) if z > epsilon else (kappa * z + 16.0) / 116.0
+    
+    L = 116.0 * fy - 16.0
+    a = 500.0 * (fx - fy)
+    lab_b = 200.0 * (fy - fz)
+    
+    return (L, a, lab_b)
+
+
+def lut_levels(bits):
+    """8-bit values sampled by an N-bit LUT (same expansion as the firmware)."""
+    shift = 8 - bits
+    return [(i << shift) | (i >> (bits - shift)) for i in range(1 << bits)]
+
+
+def lab_from_linear(rf, gf, bf, exact=True):
+    """
+    rgb_to_lab() on broadcastable arrays of linear RGB values.
+    
+    With exact=True cube roots are taken with Python floats: NumPy's
+    vectorized pow may differ in the last bit, and the generated LUT
+    must match the scalar generator exactly.
+    """
+    x = rf * 0.4124564 + gf * 0.3575761 + bf * 0.1804375
+    y = rf * 0.2126729 + gf * 0.7151522 + bf * 0.0721750
+    z = rf * 0.0193339 + gf * 0.1191920 + bf * 0.9503041
+    
+    x /= 0.95047
+    y /= 1.00000
+    z /= 1.08883
+    
+    epsilon = 0.008856
+    kappa = 903.3
+    
+    def f(t):
+        if exact:
+            cube_root = np.array([v ** (1/3) for v in t.ravel().tolist()]).reshape(t.shape)
+        else:
+            cube_root = t ** (1/3)
+        return np.where(t > epsilon, cube_root, (kappa * t + 16.0) / 116.0)
+    
+    fx = f(x)
+    fy = f(y)
+    fz = f(z)
+    
+    return np.stack([116.0 * fy - 16.0, 500.0 * (fx - fy), 200.0 * (fy - fz)], axis=-1)
+
+
+def lab_distances(lab, palette_lab):
+    """Squared CIE76 Delta E from each Lab value to each palette entry."""
+    diff = lab[..., np.newaxis, :] - palette_lab
+    return diff[..., 0] * diff[..., 0] + diff[..., 1] * diff[..., 1] + diff[..., 2] * diff[..., 2]
+
+
+def nearest_palette_grid(palette, bits):
+    """Palette index chosen for every LUT cell, shape (2^bits,) * 3 (r, g, b)."""
+    # Pre-compute Lab values for palette
+    palette_lab = np.array([rgb_to_lab(r, g, b) for r, g, b in palette])
+    
+    linear = np.array(srgb_to_linear)[lut_levels(bits)]
+    lab = lab_from_linear(linear[:, np.newaxis, np.newaxis],
+                          linear[np.newaxis, :, np.newaxis],
+                          linear[np.newaxis, np.newaxis, :])
+    
+    # argmin keeps the first of equal distances, like the strict < in
+    # generate_color_lut.find_nearest_lab()
+    return np.argmin(lab_distances(lab, palette_lab), axis=-1)
@@ -0,0 +1,41 @@
+"""
+RGB → palette lookup tables for fast color mapping.
+
+The table is the same kind generate_color_lut.py emits for the firmware,
+built by eink_pipeline.palette: every N-bit-per-channel RGB cell holds the palette entry nearest in CIE
+Lab. Mapping a frame is then a single gather on the truncated channels
+instead of a full-frame Lab conversion and distance search.
+"""
+
+import functools
+
+import numpy as np
+
+from eink_pipeline.palette import nearest_palette_grid
+
+# Default bits per channel for host-side mapping: 64x64x64 = 256KB table
+DEFAULT_LUT_BITS = 6
+
+
+@functools.lru_cache(maxsize=None)
+def palette_lut(palette, bits=DEFAULT_LUT_BITS):
+    """
+    Flat table of palette indices for a palette (tuple of RGB tuples).
+
+    Built once per (palette, bits) and cached for the life of the process.
+    """
+    grid = nearest_palette_grid(list(palette), bits).astype(np.uint8).ravel()
+    grid.flags.writeable = False
+    return grid
+
+
+def lookup_palette_indices(rgb, palette, bits=DEFAULT_LUT_BITS):
+    """Map an (H, W, 3) uint8 array to (H, W) palette indices via the LUT."""
+    lut = palette_lut(tuple(map(tuple, palette)), bits)
+    shift = 8 - bits
+    # Build the flat cell index one channel at a time in uint32 to keep
+    # transient memory at a few full-frame planes
+    index = (rgb[..., 0] >> shift).astype(np.uint32) << (2 * bits)
+    index |= (rgb[..., 1] >> shift).astype(np.uint32) << bits
+    index |= rgb[..., 2] >> shift
+    return lut[index]
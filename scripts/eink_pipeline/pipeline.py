@@ -0,0 +1,296 @@
+"""
+Image conversion stages for the EL133UF1 panel, usable without a CLI.
+
+Each stage takes its options as explicit parameters and keeps no per-run
+state, so a long-running service or a worker pool can call them directly:
+
+    image = load_image(path)                   # decode (reduced JPEG/HEIF scale)
+    image = fit_image(image)                   # resize/pad to 1600x1200 or 1200x1600
+    mask = detect_keepout_mask(image)          # optional keep-out mask
+    image = enhance(image)                     # brightness/contrast/saturation/sharpen
+    quantized = quantize(image)                # 6-color palette image
+    write_outputs(quantized, 'out/photo', keep_out_mask=mask)
+
+Detectors, YOLO models and lookup tables are cached process-wide by the
+modules that own them, so only the first image pays for loading them.
+convert_image_with_maps.py is a thin command line wrapper around these
+functions; prepare_eink_image.py shares loading, detection and the keep-out
+map writer.
+"""
+
+import os
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from eink_pipeline.backends import backend_available
+from eink_pipeline.decode import draft_for_target, register_heif_opener
+from eink_pipeline.detection import get_detector
+from eink_pipeline.dither import PALETTE_CODES, PALETTE_IMAGE, quantize_atkinson
+from eink_pipeline.enhance import enhance_image, enhance_image_chain
+from eink_pipeline.framebuffer import write_s6
+from eink_pipeline.komap import write_keepout_map
+from eink_pipeline.masks import dilate_box, resize_nearest
+from eink_pipeline.models import model_name
+
+# Target panel sizes
+TARGET_SIZE_LANDSCAPE = (1600, 1200)
+TARGET_SIZE_PORTRAIT = (1200, 1600)
+
+# PIL dither modes accepted by quantize(); ATKINSON is ours
+DITHER_NONE = 0
+DITHER_ATKINSON = 1
+DITHER_FLOYD_STEINBERG = 3
+
+
+def panel_size(width, height, direction=None):
+    """Target (width, height) for an image: direction if given, else by its orientation."""
+    if direction:
+        return TARGET_SIZE_LANDSCAPE if direction == 'landscape' else TARGET_SIZE_PORTRAIT
+    return TARGET_SIZE_LANDSCAPE if width > height else TARGET_SIZE_PORTRAIT
+
+
+def load_image(path, direction=None, mode='scale'):
+    """
+    Open and decode an image, at a reduced JPEG/HEIF scale where that still
+    covers the panel size fit_image() will use with the same direction and mode.
+    """
+    register_heif_opener()
+    image = Image.open(path)
+    draft_for_target(image, panel_size(*image.size, direction),
+                     fit='cover' if mode == 'scale' else 'contain')
+    image.load()
+    return image
+
+
+def fit_image(image, direction=None, mode='scale'):
+    """
+    Resize a decoded image to the panel size.
+
+    mode='scale' fills the panel and crops the overflow; mode='cut' fits the
+    whole image and pads the rest with white.
+    """
+    width, height = image.size
+    target_width, target_height = panel_size(width, height, direction)
+
+    if mode == 'scale':
+        scale_ratio = max(target_width / width, target_height / height)
+        resized_width = int(width * scale_ratio)
+        resized_height = int(height * scale_ratio)
+        output_image = image.resize((resized_width, resized_height))
+        resized_image = Image.new('RGB', (target_width, target_height), (255, 255, 255))
+        left = (target_width - resized_width) // 2
+        top = (target_height - resized_height) // 2
+        resized_image.paste(output_image, (left, top))
+    else:
+        resized_image = ImageOps.pad(
+            image,
+            size=(target_width, target_height),
+            color=(255, 255, 255),
+            centering=(0.5, 0.5)
+        )
+
+    return resized_image
+
+
+def enhance(image, brightness=1.1, contrast=1.2, saturation=1.2, method='fused'):
+    """
+    Brightness, contrast and saturation, then EDGE_ENHANCE, SMOOTH and
+    SHARPEN. method='chain' runs the separate PIL passes instead of the
+    banded fused stage; both give the same pixels (see eink_pipeline.enhance).
+    """
+    enhance_func = enhance_image if method == 'fused' else enhance_image_chain
+    return enhance_func(image, brightness, contrast, saturation)
+
+
+def quantize(image, dither=DITHER_ATKINSON):
+    """Quantize to the 6-color palette; returns a 'P' image indexing PALETTE_COLORS."""
+    if dither == DITHER_ATKINSON:
+        return quantize_atkinson(image).convert('RGB').quantize(palette=PALETTE_IMAGE,
+                                                                dither=Image.Dither.NONE)
+    return image.quantize(dither=Image.Dither(dither), palette=PALETTE_IMAGE)
+
+
+def detect_keepout_mask(image, confidence=0.3, expand_margin=50, segmentation=True, model_size='n',
+                        backend='torch', model_path=None, verbose=False):
+    """
+    Detect objects with YOLOv8 and build the keep-out mask for one image.
+
+    Args:
+        image: PIL Image (RGB)
+        confidence: Detection confidence threshold (0.0-1.0)
+        expand_margin: Pixels to expand around detected objects
+        segmentation: If True, use pixel-level segmentation (precise).
+                      If False, use bounding boxes (faster).
+        model_size: n=nano (fastest), s=small, m=medium, l=large, x=xlarge (most accurate)
+        backend: Detection runtime: torch, onnx or openvino
+        model_path: Local model file (default: the standard name for the model size)
+        verbose: Print detection details
+
+    Returns:
+        numpy array: Keep-out mask (255 = keep out, 0 = safe), or None if
+        nothing was detected or detection is unavailable
+    """
+    return detect_keepout_masks([image], confidence, expand_margin, segmentation, model_size,
+                                backend, model_path, verbose)[0]
+
+
+def detect_keepout_masks(images, confidence=0.3, expand_margin=50, segmentation=True, model_size='n',
+                         backend='torch', model_path=None, verbose=False):
+    """
+    Detect objects in several images with a single detector call.
+
+    Takes the same options as detect_keepout_mask() and returns one keep-out
+    mask (or None) per input image, in input order.
+    """
+    if not backend_available(backend):
+        if verbose:
+            print(f"  {backend} detection backend not available, skipping object detection")
+        return [None] * len(images)
+
+    method = "segmentation" if segmentation else "bounding boxes"
+    if verbose:
+        print(f"  Running YOLO object detection ({method}, confidence={confidence}, batch={len(images)})...")
+
+    # Try the segmentation model if requested; detectors are cached
+    # process-wide, so only the first image pays for loading
+    try:
+        detector = get_detector(backend, model_size, segmentation, model_path)
+        if verbose:
+            print(f"    Using model: {model_path or model_name(model_size, segmentation)} ({backend})")
+    except Exception as e:
+        if verbose:
+            print(f"  ERROR: Failed to load YOLO model: {e}")
+        if segmentation:
+            if verbose:
+                print("  Falling back to bounding boxes...")
+            segmentation = False
+            try:
+                detector = get_detector(backend, 'n', segmentation=False)
+            except Exception:
+                return [None] * len(images)
+        else:
+            return [None] * len(images)
+
+    results = detector.detect(images, confidence)
+
+    keep_out_masks = []
+    for image, result in zip(images, results):
+        w, h = image.size
+        keep_out_masks.append(
+            keepout_mask_from_detections(result, h, w, expand_margin, segmentation, verbose)
+        )
+    return keep_out_masks
+
+
+def keepout_mask_from_detections(result, h, w, expand_margin=50, segmentation=True, verbose=False):
+    """Build the keep-out mask for one image from its Detections."""
+    keep_out_mask = np.zeros((h, w), dtype=np.uint8)
+    names = result.names
+
+    detections = 0
+    # Try segmentation masks first (more accurate)
+    if segmentation and result.masks is not None:
+        # OR all instances at model resolution, then upscale and expand the
+        # union once; dilation distributes over union, so this is the same
+        # as expanding each instance on its own
+        instances = result.masks > 0.5
+        union_mask = instances.any(axis=0).astype(np.uint8) * 255
+
+        # Resize mask to image size if needed
+        if union_mask.shape != (h, w):
+            union_mask = resize_nearest(union_mask, (w, h))
+
+        # Expand mask by dilation with a (2*margin)x(2*margin) square
+        if expand_margin > 0:
+            union_mask = dilate_box(union_mask, expand_margin * 2)
+        keep_out_mask = union_mask
+
+        detections = len(instances)
+        if verbose:
+            for instance, conf, cls in zip(instances, result.scores, result.classes):
+                class_name = names.get(int(cls), str(cls))
+                print(f"    Detected: {class_name} (conf={conf:.2f}) - {instance.mean() * 100:.1f}% of frame")
+
+    # Fallback to bounding boxes
+    else:
+        for (x1, y1, x2, y2), conf, cls in zip(result.boxes, result.scores, result.classes):
+            class_name = names.get(int(cls), str(cls))
+
+            # Expand box by margin
+            x1 = max(0, int(x1) - expand_margin)
+            y1 = max(0, int(y1) - expand_margin)
+            x2 = min(w, int(x2) + expand_margin)
+            y2 = min(h, int(y2) + expand_margin)
+
+            # Mark as keep-out area
+            keep_out_mask[y1:y2, x1:x2] = 255
+
+            detections += 1
+            if verbose:
+                print(f"    Detected: {class_name} (conf={conf:.2f}) at [{x1},{y1},{x2},{y2}]")
+
+    if detections == 0:
+        if verbose:
+            print("    No objects detected")
+        return None
+
+    if verbose:
+        coverage = (keep_out_mask > 0).sum() / (h * w) * 100
+        print(f"    Total objects: {detections}, Coverage: {coverage:.1f}%")
+
+    return keep_out_mask
+
+
+def save_keepout_map(keep_out_mask, output_path, verbose=False):
+    """
+    Save keep-out map in binary format.
+
+    File format:
+        Header (16 bytes):
+            - Magic: "KOMAP" (5 bytes)
+            - Version: uint8 (1 byte) - currently 1
+            - Width: uint16 LE (2 bytes)
+            - Height: uint16 LE (2 bytes)
+            - Reserved: 6 bytes (for future use)
+        Data:
+            - Bitmap: (width * height + 7) / 8 bytes (1 bit per pixel)
+            - 1 = keep out, 0 = safe for text
+    """
+    if keep_out_mask is None:
+        if verbose:
+            print("  No keep-out map to save")
+        return
+
+    if verbose:
+        print(f"  Saving keep-out map: {output_path}")
+
+    write_keepout_map(keep_out_mask, output_path)
+
+    if verbose:
+        file_size = os.path.getsize(output_path)
+        print(f"    Map size: {file_size} bytes ({file_size / 1024:.1f} KB)")
+
+
+def write_outputs(quantized, output_base, output_format='png', keep_out_mask=None,
+                  s6_layout='panel', rotate_180=False, verbose=False):
+    """
+    Write a quantize() result as output_base + '.png' or '.s6', plus
+    output_base + '.map' if a keep-out mask is given.
+
+    Returns the list of written paths.
+    """
+    image_path = f'{output_base}.{output_format}'
+    if output_format == 's6':
+        write_s6(PALETTE_CODES[np.asarray(quantized)], image_path,
+                 panel_layout=(s6_layout == 'panel'), rotate_180=rotate_180)
+    else:
+        quantized.save(image_path, optimize=True)
+
+    written = [image_path]
+    if keep_out_mask is not None:
+        save_keepout_map(keep_out_mask, output_base + '.map', verbose=verbose)
+        written.append(output_base + '.map')
+    if verbose:
+        print(f"  Saved: {', '.join(written)}")
+    return written
@@ -0,0 +1,114 @@
+"""
+Incremental copy of prepared images to the SD card.
+
+The pipeline writes its outputs to a local staging directory; sync_outputs()
+then brings the card up to date by writing only files whose size or content
+differs. Each write goes to a temporary name in the destination directory
+and is renamed over the target, so a pulled card or a crash never leaves a
+half-written BMP under its real name.
+
+Only files with the managed extensions are considered: the formats the
+pipeline writes for the card (BMP and .s6 images, .map keep-out maps).
+Anything else on the card (configuration, audio, other pictures, ...) is
+never compared or deleted.
+"""
+
+import hashlib
+import os
+import shutil
+
+MANAGED_EXTENSIONS = ('.bmp', '.map', '.s6')
+
+_TMP_PREFIX = '.sync-tmp-'
+_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.digest()
+
+
+def files_match(src, dst):
+    """True if dst exists with the same size and contents as src."""
+    try:
+        if os.path.getsize(src) != os.path.getsize(dst):
+            return False
+    except FileNotFoundError:
+        return False
+    return file_digest(src) == file_digest(dst)
+
+
+def atomic_copy(src, dst):
+    """Copy src to dst through a temporary file renamed into place."""
+    tmp = os.path.join(os.path.dirname(dst), _TMP_PREFIX + os.path.basename(dst))
+    try:
+        with open(src, 'rb') as fsrc, open(tmp, 'wb') as fdst:
+            shutil.copyfileobj(fsrc, fdst, _CHUNK_SIZE)
+            fdst.flush()
+            os.fsync(fdst.fileno())
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _managed_files(directory, extensions):
+    return {entry.name for entry in os.scandir(directory)
+            if entry.is_file()
+            and not entry.name.startswith(_TMP_PREFIX)
+            and os.path.splitext(entry.name)[1].lower() in extensions}
+
+
+def sync_outputs(staging_dir, dest_dir, delete_orphans=False,
+                 extensions=MANAGED_EXTENSIONS, dry_run=False, verbose=False):
+    """
+    Make the managed files in dest_dir match those in staging_dir.
+
+    Files are compared by size first and by SHA-256 only when the sizes
+    agree. With delete_orphans, managed files in dest_dir that no longer
+    exist in staging_dir are removed. With dry_run nothing in dest_dir is
+    created, written or removed; the counts say what a real run would do.
+    Returns a dict of counts: copied, unchanged, deleted and bytes_written.
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    dest_exists = os.path.isdir(dest_dir)
+    if not dry_run:
+        os.makedirs(dest_dir, exist_ok=True)
+        # Leftovers from an interrupted sync
+        for entry in os.scandir(dest_dir):
+            if entry.name.startswith(_TMP_PREFIX):
+                os.remove(entry.path)
+
+    result = {'copied': 0, 'unchanged': 0, 'deleted': 0, 'bytes_written': 0}
+    staged = _managed_files(staging_dir, extensions)
+    for name in sorted(staged):
+        src = os.path.join(staging_dir, name)
+        dst = os.path.join(dest_dir, name)
+        if files_match(src, dst):
+            result['unchanged'] += 1
+            continue
+        if verbose:
+            print(f"  {'Would copy' if dry_run else 'Copying'}: {name}")
+        if not dry_run:
+            atomic_copy(src, dst)
+        result['copied'] += 1
+        result['bytes_written'] += os.path.getsize(src)
+
+    if delete_orphans and dest_exists:
+        # Compare names case-insensitively: SD cards are usually FAT/exFAT
+        staged_lower = {name.lower() for name in staged}
+        orphans = [name for name in _managed_files(dest_dir, extensions)
+                   if name.lower() not in staged_lower]
+        for name in sorted(orphans):
+            if verbose:
+                print(f"  {'Would delete' if dry_run else 'Deleting'}: {name}")
+            if not dry_run:
+                os.remove(os.path.join(dest_dir, name))
+            result['deleted'] += 1
+
+    return result
@@ -8,6 +8,14 @@
 # Usage:
 #   ./example_prepare_batch.sh /path/to/photos/ /path/to/sd_card/
 #
+# Images are prepared into a fresh temporary staging directory and then
+# synced to the output directory, writing only files that changed since the
+# last run. Unchanged photos are copied from a conversion cache instead of
+# being converted again; set CACHE_DIR to choose its location (default:
+# <input_dir>/.eink_cache). Set SYNC_DELETE=1 to also remove outputs whose
+# source photo is gone; this is skipped when any image failed, so a failed
+# conversion never deletes the copy already on the card.
+#
 
 set -e  # Exit on error
 
@@ -22,6 +30,7 @@ fi
 
 INPUT_DIR="$1"
 OUTPUT_DIR="$2"
+CACHE_DIR="${CACHE_DIR:-$INPUT_DIR/.eink_cache}"
 
 # Check if directories exist
 if [ ! -d "$INPUT_DIR" ]; then
@@ -37,6 +46,7 @@ fi
 # Get the script directory
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 PREPARE_SCRIPT="$SCRIPT_DIR/prepare_eink_image.py"
+SYNC_SCRIPT="$SCRIPT_DIR/sync_sd_card.py"
 
 if [ ! -f "$PREPARE_SCRIPT" ]; then
     echo "Error: prepare_eink_image.py not found at: $PREPARE_SCRIPT"
@@ -47,49 +57,40 @@ echo "=========================================="
 echo "  Batch Image Preparation for EL133UF1"
 echo "=========================================="
 echo ""
-echo "Input:  $INPUT_DIR"
-echo "Output: $OUTPUT_DIR"
+# Staging only ever holds this run's outputs, so SYNC_DELETE can tell which
+# photos were removed since the last run
+STAGING_DIR="$(mktemp -d "${TMPDIR:-/tmp}/eink_staging.XXXXXX")"
+trap 'rm -rf "$STAGING_DIR"' EXIT
+
+echo "Input:   $INPUT_DIR"
+echo "Cache:   $CACHE_DIR"
+echo "Output:  $OUTPUT_DIR"
 echo ""
 
-# Find all image files (common formats)
-IMAGE_FILES=($(find "$INPUT_DIR" -maxdepth 1 -type f \( -iname "*.jpg" -o -iname "*.jpeg" -o -iname "*.png" -o -iname "*.webp" \) | sort))
+# One interpreter for the whole directory: the YOLO model and color LUT are
+# loaded once, and the script prints aggregate success/failure counts
+STATUS=0
+python "$PREPARE_SCRIPT" "$INPUT_DIR" "$STAGING_DIR" --no-recursive --confidence 0.3 --expand 50 \
+    --cache-dir "$CACHE_DIR" || STATUS=$?
 
-if [ ${#IMAGE_FILES[@]} -eq 0 ]; then
-    echo "Error: No image files found in $INPUT_DIR"
-    echo "Supported formats: .jpg, .jpeg, .png, .webp"
-    exit 1
+if [ $STATUS -ne 0 ]; then
+    echo ""
+    echo "Warning: some images failed (see above); syncing the ones that succeeded"
 fi
-
-echo "Found ${#IMAGE_FILES[@]} image(s) to process"
 echo ""
 
-# Process each image
-SUCCESS=0
-FAILED=0
-
-for img in "${IMAGE_FILES[@]}"; do
-    BASENAME=$(basename "$img")
-    echo "Processing: $BASENAME"
-    
-    if python "$PREPARE_SCRIPT" "$img" "$OUTPUT_DIR" --confidence 0.3 --expand 50; then
-        SUCCESS=$((SUCCESS + 1))
-        echo "  ✓ Success"
+# Copy only new or changed files to the output directory
+SYNC_ARGS=()
+if [ "${SYNC_DELETE:-0}" = "1" ]; then
+    if [ $STATUS -eq 0 ]; then
+        SYNC_ARGS+=(--delete)
     else
-        FAILED=$((FAILED + 1))
-        echo "  ✗ Failed"
+        echo "Not deleting outputs from the card because some images failed"
     fi
-    echo ""
-done
-
-echo "=========================================="
-echo "  Batch Processing Complete"
-echo "=========================================="
-echo ""
-echo "Results:"
-echo "  Successful: $SUCCESS"
-echo "  Failed:     $FAILED"
-echo "  Total:      ${#IMAGE_FILES[@]}"
+fi
+python "$SYNC_SCRIPT" "$STAGING_DIR" "$OUTPUT_DIR" "${SYNC_ARGS[@]}"
 echo ""
+
 echo "Output files in: $OUTPUT_DIR"
 echo ""
 
@@ -102,7 +103,8 @@ ls -lh "$OUTPUT_DIR"/*.map 2>/dev/null | awk '{print "  " $9 " (" $5 ")"}'
 echo ""
 
 echo "Next steps:"
-echo "  1. Copy *.bmp and *.map files to SD card root"
-echo "  2. Insert SD card into device"
-echo "  3. Device will automatically use maps when available!"
+echo "  1. Insert SD card into device"
+echo "  2. Device will automatically use maps when available!"
 echo ""
+
+exit $STATUS
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Export a YOLOv8 model for the ONNX Runtime or OpenVINO detection backends.
+
+Run this once on a machine with torch and ultralytics installed. The exported
+files are all the onnx/openvino backends need at conversion time; by default
+they are written where those backends look for them:
+
+    yolov8n.onnx, yolov8n-seg.onnx                      (--format onnx)
+    yolov8n_int8_openvino_model/yolov8n.xml             (--format openvino)
+
+OpenVINO models are INT8-quantized unless --no-int8 is given (that writes
+yolov8n_openvino_model/ instead; pass it with --map-model-path). Quantization
+calibrates on a small dataset (--data, default coco128.yaml, downloaded by
+ultralytics on first use).
+
+Usage:
+    python export_detection_model.py --format onnx
+    python export_detection_model.py --format openvino --segmentation
+    python convert_image_with_maps.py photos/ --generate-maps --map-backend openvino
+"""
+
+import argparse
+import sys
+
+from eink_pipeline.detection import INPUT_SIZE
+from eink_pipeline.models import model_name
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export YOLOv8 weights to ONNX or OpenVINO IR for CPU keep-out map detection'
+    )
+    parser.add_argument('--format', choices=['onnx', 'openvino'], default='onnx',
+                        help='Export target (default: onnx)')
+    parser.add_argument('--model', choices=['n', 's', 'm', 'l', 'x'], default='n',
+                        help='YOLO model size (default: n)')
+    parser.add_argument('--segmentation', action='store_true',
+                        help='Export the segmentation model (for --map-method segmentation)')
+    parser.add_argument('--weights',
+                        help='Source .pt weights (default: the standard name for --model)')
+    parser.add_argument('--no-int8', action='store_true',
+                        help='Keep OpenVINO weights in floating point instead of INT8')
+    parser.add_argument('--data', default='coco128.yaml',
+                        help='Calibration dataset for INT8 quantization (default: coco128.yaml)')
+    parser.add_argument('--imgsz', type=int, default=INPUT_SIZE,
+                        help=f'Model input size (default: {INPUT_SIZE})')
+
+    args = parser.parse_args()
+
+    try:
+        from ultralytics import YOLO
+    except ImportError:
+        print("ERROR: Exporting requires ultralytics. Install with:", file=sys.stderr)
+        print("  pip install torch ultralytics", file=sys.stderr)
+        return 1
+
+    weights = args.weights or model_name(args.model, args.segmentation)
+    options = {'format': args.format, 'imgsz': args.imgsz}
+    if args.format == 'openvino' and not args.no_int8:
+        options.update(int8=True, data=args.data)
+
+    print(f"Exporting {weights} to {args.format}{' (INT8)' if options.get('int8') else ''}...")
+    exported = YOLO(weights).export(**options)
+    print(f"Exported: {exported}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
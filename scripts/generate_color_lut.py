@@ -8,22 +8,49 @@ during compilation and storing it in flash (PROGMEM).
 The LUT uses Lab color space for perceptually accurate color matching,
 identical to the runtime algorithm.
 
-5-bit per channel (32x32x32 = 32KB) is optimal:
-- Larger LUTs provide no benefit for 6-color output
-- Smaller LUTs may show banding in gradients
+5-bit per channel (32x32x32 = 32KB) is the default. 4-bit (4KB) saves
+flash at the cost of some banding in gradients, 6-bit (256KB) is mostly
+useful as a quality reference; --report measures the difference against
+a full 8-bit mapping so the smallest acceptable size can be chosen.
+
+Several named LUTs (e.g. one per calibrated panel palette) can be written
+into the same header. SPECTRA6_COLOR_LUT, used by the firmware, is always
+included and uses DEFAULT_PALETTE unless overridden with
+--palette SPECTRA6=<file>.
+
+Palette files list the six colors in Spectra order (black, white, yellow,
+red, blue, green), one "R G B" or "R,G,B" triple per line; blank lines and
+text after '#' are ignored.
 
 Usage:
     python generate_color_lut.py [output_file]
+    python generate_color_lut.py out.h --bits 4 --palette PANEL_B=panel_b.txt
+    python generate_color_lut.py --report --bits 4 > /dev/null
 """
 
-import math
+import argparse
+import re
 import sys
 import os
 
-# Fixed at 5-bit: optimal for 6-color output
+# NumPy makes generation near-instant; without it the scalar path is used
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from eink_pipeline.palette import (lab_distances, lab_from_linear, lut_levels, nearest_palette_grid,
+                                   rgb_to_lab, srgb_to_linear)
+
+# Default 5-bit: 32x32x32 entries
 COLOR_LUT_BITS = 5
-COLOR_LUT_SIZE = 32    # 2^5
-COLOR_LUT_TOTAL = 32768  # 32^3
+
+# Supported bits per channel (the 8-bit expansion in lut_levels() needs bits >= 4)
+COLOR_LUT_MIN_BITS = 4
+COLOR_LUT_MAX_BITS = 6
+
+# Name of the LUT the firmware reads (SPECTRA6_COLOR_LUT)
+DEFAULT_LUT_NAME = 'SPECTRA6'
 
 # Spectra 6 color codes (must match EL133UF1.h)
 EL133UF1_BLACK = 0
@@ -53,47 +80,6 @@ DEFAULT_PALETTE = [
     (55, 140, 85),      # Green (teal/forest)
 ]
 
-# Pre-computed sRGB to linear LUT
-srgb_to_linear = []
-for i in range(256):
-    v = i / 255.0
-    if v > 0.04045:
-        srgb_to_linear.append(((v + 0.055) / 1.055) ** 2.4)
-    else:
-        srgb_to_linear.append(v / 12.92)
-
-
-def rgb_to_lab(r, g, b):
-    """Convert RGB to CIE Lab color space."""
-    # sRGB to linear RGB
-    rf = srgb_to_linear[r]
-    gf = srgb_to_linear[g]
-    bf = srgb_to_linear[b]
-    
-    # Linear RGB to XYZ
-    x = rf * 0.4124564 + gf * 0.3575761 + bf * 0.1804375
-    y = rf * 0.2126729 + gf * 0.7151522 + bf * 0.0721750
-    z = rf * 0.0193339 + gf * 0.1191920 + bf * 0.9503041
-    
-    # Normalize for D65 white point
-    x /= 0.95047
-    y /= 1.00000
-    z /= 1.08883
-    
-    # XYZ to Lab
-    epsilon = 0.008856
-    kappa = 903.3
-    
-    fx = x ** (1/3) if x > epsilon else (kappa * x + 16.0) / 116.0
-    fy = y ** (1/3) if y > epsilon else (kappa * y + 16.0) / 116.0
-    fz = z ** (1/3) if z > epsilon else (kappa * z + 16.0) / 116.0
-    
-    L = 116.0 * fy - 16.0
-    a = 500.0 * (fx - fy)
-    lab_b = 200.0 * (fy - fz)
-    
-    return (L, a, lab_b)
-
 
 def find_nearest_lab(r, g, b, palette_lab):
     """Find nearest palette color using Lab color space."""
@@ -116,28 +102,102 @@ def find_nearest_lab(r, g, b, palette_lab):
     return SPECTRA_CODE[best_idx]
 
 
-def generate_lut(palette):
+def generate_lut(palette, bits=COLOR_LUT_BITS):
     """Generate the complete RGB→Spectra LUT."""
+    if np is None:
+        return generate_lut_scalar(palette, bits)
+    
+    nearest = nearest_palette_grid(palette, bits)
+    return np.array(SPECTRA_CODE)[nearest].ravel().tolist()
+
+
+def generate_lut_scalar(palette, bits=COLOR_LUT_BITS):
+    """Generate the LUT one entry at a time (fallback when NumPy is missing)."""
     # Pre-compute Lab values for palette
     palette_lab = [rgb_to_lab(r, g, b) for r, g, b in palette]
+    levels = lut_levels(bits)
     
     lut = []
     
-    for ri in range(COLOR_LUT_SIZE):
-        # Expand 5-bit to 8-bit: replicate top bits into bottom
-        r = (ri << 3) | (ri >> 2)
-        for gi in range(COLOR_LUT_SIZE):
-            g = (gi << 3) | (gi >> 2)
-            for bi in range(COLOR_LUT_SIZE):
-                b = (bi << 3) | (bi >> 2)
+    for r in levels:
+        for g in levels:
+            for b in levels:
                 color = find_nearest_lab(r, g, b, palette_lab)
                 lut.append(color)
     
     return lut
 
 
-def format_lut_as_c_header(lut):
-    """Format LUT as a C header file."""
+def measure_lut_error(palette, bits=COLOR_LUT_BITS):
+    """
+    Compare an N-bit LUT against exact nearest-color mapping of all 2^24
+    RGB values.
+    
+    Returns a dict with the fraction of colors mapped differently and the
+    mean / max Delta E (CIE76) the LUT adds over the best palette match.
+    """
+    palette_lab = np.array([rgb_to_lab(r, g, b) for r, g, b in palette])
+    lut_grid = nearest_palette_grid(palette, bits)
+    shift = 8 - bits
+    
+    linear = np.array(srgb_to_linear)
+    cells = np.arange(256) >> shift
+    gf = linear[:, np.newaxis]
+    bf = linear[np.newaxis, :]
+    
+    mismatched = 0
+    penalty_sum = 0.0
+    penalty_max = 0.0
+    
+    # One red level at a time keeps memory at a few MB
+    for r in range(256):
+        lab = lab_from_linear(linear[r], gf, bf, exact=False)
+        delta_e = np.sqrt(lab_distances(lab, palette_lab))
+        best = delta_e.min(axis=-1)
+        chosen = lut_grid[cells[r]][cells[:, np.newaxis], cells[np.newaxis, :]]
+        penalty = np.take_along_axis(delta_e, chosen[..., np.newaxis], axis=-1)[..., 0] - best
+        
+        mismatched += int(np.count_nonzero(penalty > 0))
+        penalty_sum += float(penalty.sum())
+        penalty_max = max(penalty_max, float(penalty.max()))
+    
+    total = 1 << 24
+    return {
+        'mismatch': mismatched / total,
+        'mean_delta_e': penalty_sum / total,
+        'max_delta_e': penalty_max,
+    }
+
+
+def load_palette(path):
+    """Read a six-color palette file (see module docstring for the format)."""
+    palette = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            values = [v for v in re.split(r'[,\s]+', line) if v]
+            try:
+                color = tuple(int(v) for v in values)
+            except ValueError:
+                raise ValueError(f"{path}:{line_no}: expected R G B integers, got {line!r}")
+            if len(color) != 3 or not all(0 <= c <= 255 for c in color):
+                raise ValueError(f"{path}:{line_no}: expected three values 0-255, got {line!r}")
+            palette.append(color)
+    
+    if len(palette) != len(SPECTRA_CODE):
+        raise ValueError(f"{path}: expected {len(SPECTRA_CODE)} colors, found {len(palette)}")
+    return palette
+
+
+def format_lut_as_c_header(luts):
+    """
+    Format LUTs as a C header file.
+    
+    luts is a list of (name, bits, description, lut) tuples; each becomes
+    <name>_COLOR_LUT_BITS and a PROGMEM <name>_COLOR_LUT array.
+    """
     lines = []
     lines.append("/**")
     lines.append(" * @file EL133UF1_ColorLUT.h")
@@ -146,49 +206,95 @@ def format_lut_as_c_header(lut):
     lines.append(" * AUTO-GENERATED FILE - DO NOT EDIT MANUALLY")
     lines.append(" * Generated by: scripts/generate_color_lut.py")
     lines.append(" * ")
-    lines.append(" * This LUT maps 5-bit-per-channel RGB values to Spectra 6 colors")
+    lines.append(" * Each LUT maps N-bit-per-channel RGB values to Spectra 6 colors")
     lines.append(" * using CIE Lab perceptual color matching.")
     lines.append(" * ")
-    lines.append(" * Size: 32KB (32x32x32)")
-    lines.append(" * 5-bit is optimal - larger LUTs offer no benefit for 6-color output")
+    for name, bits, description, lut in luts:
+        size = 1 << bits
+        lines.append(f" * {name}_COLOR_LUT: {bits}-bit, {size}x{size}x{size} = {len(lut)} bytes ({description})")
     lines.append(" */")
     lines.append("")
     lines.append("#ifndef EL133UF1_COLORLUT_H")
     lines.append("#define EL133UF1_COLORLUT_H")
     lines.append("")
     lines.append("#include <Arduino.h>")
-    lines.append("")
-    lines.append("// Store in flash (PROGMEM) to save RAM")
-    lines.append(f"static const uint8_t PROGMEM SPECTRA6_COLOR_LUT[{len(lut)}] = {{")
     
-    # Format data in rows of 32 values
-    for i in range(0, len(lut), 32):
-        chunk = lut[i:i+32]
-        line = "    " + ", ".join(f"{v}" for v in chunk) + ","
-        lines.append(line)
+    for name, bits, description, lut in luts:
+        lines.append("")
+        lines.append(f"#define {name}_COLOR_LUT_BITS {bits}")
+        lines.append("")
+        lines.append("// Store in flash (PROGMEM) to save RAM")
+        lines.append(f"static const uint8_t PROGMEM {name}_COLOR_LUT[{len(lut)}] = {{")
+        
+        # Format data in rows of 32 values
+        for i in range(0, len(lut), 32):
+            chunk = lut[i:i+32]
+            line = "    " + ", ".join(f"{v}" for v in chunk) + ","
+            lines.append(line)
+        
+        lines.append("};")
     
-    lines.append("};")
     lines.append("")
     lines.append("#endif // EL133UF1_COLORLUT_H")
     
     return "\n".join(lines)
 
 
+def parse_palette_arg(value):
+    """argparse type for --palette NAME=FILE."""
+    name, sep, path = value.partition('=')
+    name = name.upper()
+    if not sep or not path or not re.fullmatch(r'[A-Z_][A-Z0-9_]*', name):
+        raise argparse.ArgumentTypeError(f"expected NAME=FILE with NAME a C identifier, got {value!r}")
+    return name, path
+
+
 def main():
-    output_path = sys.argv[1] if len(sys.argv) > 1 else None
+    parser = argparse.ArgumentParser(description='Generate the RGB→Spectra6 color LUT header.')
+    parser.add_argument('output_file', nargs='?', help='Header to write (default: stdout)')
+    parser.add_argument('--bits', type=int, default=COLOR_LUT_BITS,
+                        choices=range(COLOR_LUT_MIN_BITS, COLOR_LUT_MAX_BITS + 1),
+                        help=f'Bits per channel (default: {COLOR_LUT_BITS})')
+    parser.add_argument('--palette', action='append', default=[], type=parse_palette_arg,
+                        metavar='NAME=FILE',
+                        help=f'Add a LUT named NAME_COLOR_LUT for the palette in FILE '
+                             f'(repeatable; {DEFAULT_LUT_NAME}=FILE replaces the default palette)')
+    parser.add_argument('--report', action='store_true',
+                        help='Print each LUT\'s error against full 8-bit mapping (needs NumPy)')
+    args = parser.parse_args()
+    
+    palettes = {DEFAULT_LUT_NAME: ('default palette', DEFAULT_PALETTE)}
+    for name, path in args.palette:
+        try:
+            palettes[name] = (os.path.basename(path), load_palette(path))
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
     
-    print(f"Generating 32x32x32 color LUT (32KB)...", file=sys.stderr)
-    lut = generate_lut(DEFAULT_PALETTE)
-    print(f"Generated {len(lut)} entries", file=sys.stderr)
+    if args.report and np is None:
+        parser.error("--report requires NumPy (pip install numpy)")
+    
+    size = 1 << args.bits
+    luts = []
+    for name, (description, palette) in palettes.items():
+        print(f"Generating {name}: {size}x{size}x{size} color LUT ({size ** 3} bytes)...", file=sys.stderr)
+        lut = generate_lut(palette, args.bits)
+        print(f"Generated {len(lut)} entries", file=sys.stderr)
+        luts.append((name, args.bits, description, lut))
+        
+        if args.report:
+            error = measure_lut_error(palette, args.bits)
+            print(f"  vs 8-bit reference: {error['mismatch'] * 100:.2f}% of colors differ, "
+                  f"mean Delta E +{error['mean_delta_e']:.3f}, max +{error['max_delta_e']:.2f}",
+                  file=sys.stderr)
     
     # Output as C header
-    header = format_lut_as_c_header(lut)
+    header = format_lut_as_c_header(luts)
     
     # Write to file or stdout
-    if output_path:
-        with open(output_path, 'w') as f:
+    if args.output_file:
+        with open(args.output_file, 'w') as f:
             f.write(header)
-        print(f"Written to {output_path}", file=sys.stderr)
+        print(f"Written to {args.output_file}", file=sys.stderr)
     else:
         print(header)
 
@@ -18,12 +18,15 @@ def check_and_regenerate_lut(source, target, env):
     script_path = os.path.join(project_dir, "scripts", "generate_color_lut.py")
     lut_path = os.path.join(project_dir, "lib", "EL133UF1", "EL133UF1_ColorLUT.h")
     
+    # The Lab color matching lives in the eink_pipeline package
+    palette_path = os.path.join(project_dir, "scripts", "eink_pipeline", "palette.py")
+    
     # Check if LUT exists
     if not os.path.exists(lut_path):
         print("Color LUT not found, generating...")
         regenerate = True
     # Check if script is newer than LUT
-    elif os.path.getmtime(script_path) > os.path.getmtime(lut_path):
+    elif max(os.path.getmtime(script_path), os.path.getmtime(palette_path)) > os.path.getmtime(lut_path):
         print("Color LUT generator updated, regenerating...")
         regenerate = True
     else:
@@ -11,33 +11,38 @@ This script:
 The keep-out map ensures text avoids overlapping with detected objects,
 improving readability and visual composition.
 
+Outputs are named after the input file's stem (photos/beach.jpg ->
+output_dir/beach.bmp and beach.map). Inputs whose stems collide, ignoring
+case, are reported as failed instead of overwriting each other.
+
 Requirements:
-    pip install pillow numpy torch ultralytics opencv-python
+    pip install pillow numpy torch ultralytics
+    (or onnxruntime / openvino with an exported model, see --backend)
 
 Usage:
     python prepare_eink_image.py input.jpg output_dir/
+    python prepare_eink_image.py photos/ more.jpg 'raw/*.png' output_dir/
+    python prepare_eink_image.py --from-list photos.txt output_dir/
     python prepare_eink_image.py input.png output_dir/ --confidence 0.5
     python prepare_eink_image.py input.jpg output_dir/ --no-ml  # Skip ML detection
+    python prepare_eink_image.py input.jpg output_dir/ --backend onnx --model-path yolov8n.onnx
 """
 
 import argparse
 import os
 import sys
-import struct
 from pathlib import Path
 
 import numpy as np
 from PIL import Image
 
-# Optional ML imports (graceful degradation if not available)
-try:
-    from ultralytics import YOLO
-    import torch
-    import cv2
-    HAS_ML = True
-except ImportError:
-    HAS_ML = False
-    print("Warning: ML libraries not found. Install with: pip install torch ultralytics opencv-python", file=sys.stderr)
+from eink_pipeline import __version__
+from eink_pipeline.backends import BACKENDS, BACKEND_REQUIREMENTS, backend_available
+from eink_pipeline.cache import DEFAULT_CACHE_MAX_MB, ConversionCache, cache_key, format_cache_stats
+from eink_pipeline.discovery import expand_input_paths, iter_image_files, read_path_list
+from eink_pipeline.framebuffer import write_s6
+from eink_pipeline.palette_lut import DEFAULT_LUT_BITS, lookup_palette_indices
+from eink_pipeline.pipeline import detect_keepout_mask, load_image, save_keepout_map
 
 # Display dimensions (EL133UF1)
 DISPLAY_WIDTH = 1600
@@ -70,244 +75,184 @@ SPECTRA_CODES = [
     EL133UF1_GREEN,
 ]
 
+# Palette index -> Spectra code
+INDEX_TO_CODE = np.array(SPECTRA_CODES, dtype=np.uint8)
 
-def rgb_to_lab(rgb):
-    """Convert RGB array to CIE Lab color space."""
-    # Normalize to 0-1
-    rgb = rgb.astype(float) / 255.0
-    
-    # sRGB to linear RGB
-    def srgb_to_linear(c):
-        return np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
-    
-    rgb_linear = srgb_to_linear(rgb)
+# Spectra code -> palette RGB (code 4 is unused and stays black)
+CODE_TO_RGB = np.zeros((max(SPECTRA_CODES) + 1, 3), dtype=np.uint8)
+CODE_TO_RGB[SPECTRA_CODES] = SPECTRA_PALETTE
+
+
+# Rows per band for Lab conversion: transient buffers stay a few MB
+# instead of several full-frame float64 arrays
+LAB_BAND_ROWS = 64
+
+# sRGB (0-255) to linear RGB
+_levels = np.arange(256) / 255.0
+SRGB_TO_LINEAR = np.where(_levels > 0.04045, ((_levels + 0.055) / 1.055) ** 2.4, _levels / 12.92).astype(np.float32)
+
+# Linear RGB to XYZ (using D65 illuminant), normalized for the D65 white point
+RGB_TO_XYZ_D65 = (np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041]
+]) / np.array([[0.95047], [1.00000], [1.08883]])).T.astype(np.float32)
+
+
+def rgb_to_lab(rgb, out=None, band_rows=LAB_BAND_ROWS):
+    """
+    Convert an (H, W, 3) uint8 RGB array to CIE Lab color space (float32).
     
-    # Linear RGB to XYZ (using D65 illuminant)
-    transform = np.array([
-        [0.4124564, 0.3575761, 0.1804375],
-        [0.2126729, 0.7151522, 0.0721750],
-        [0.0193339, 0.1191920, 0.9503041]
-    ])
+    The image is processed in bands of band_rows rows, each written into
+    out (allocated if not given), so peak memory is one output array plus
+    a few band-sized temporaries.
+    """
+    h = rgb.shape[0]
+    if out is None:
+        out = np.empty(rgb.shape, dtype=np.float32)
     
-    xyz = np.dot(rgb_linear, transform.T)
+    for y0 in range(0, h, band_rows):
+        y1 = min(h, y0 + band_rows)
+        _rgb_band_to_lab(rgb[y0:y1], out[y0:y1])
     
-    # Normalize for D65 white point
-    xyz[:, :, 0] /= 0.95047
-    xyz[:, :, 1] /= 1.00000
-    xyz[:, :, 2] /= 1.08883
+    return out
+
+
+def _rgb_band_to_lab(rgb, out):
+    """rgb_to_lab() for one band, written into out."""
+    xyz = SRGB_TO_LINEAR[rgb] @ RGB_TO_XYZ_D65
     
     # XYZ to Lab
     epsilon = 0.008856
     kappa = 903.3
     
-    def f(t):
-        return np.where(t > epsilon, t ** (1/3), (kappa * t + 16.0) / 116.0)
-    
-    fx = f(xyz[:, :, 0])
-    fy = f(xyz[:, :, 1])
-    fz = f(xyz[:, :, 2])
-    
-    L = 116.0 * fy - 16.0
-    a = 500.0 * (fx - fy)
-    b = 200.0 * (fy - fz)
-    
-    return np.stack([L, a, b], axis=-1)
+    f = np.where(xyz > epsilon, np.cbrt(xyz), (kappa * xyz + 16.0) / 116.0)
+    fx = f[:, :, 0]
+    fy = f[:, :, 1]
+    fz = f[:, :, 2]
+    
+    np.multiply(fy, 116.0, out=out[:, :, 0])
+    out[:, :, 0] -= 16.0
+    np.subtract(fx, fy, out=out[:, :, 1])
+    out[:, :, 1] *= 500.0
+    np.subtract(fy, fz, out=out[:, :, 2])
+    out[:, :, 2] *= 200.0
 
 
-def map_to_spectra(img):
-    """Map RGB image to Spectra 6 palette using Lab color space."""
-    print(f"  Converting to Spectra 6 palette (Lab color space)...")
+def map_to_spectra(img, method='lab', lut_bits=DEFAULT_LUT_BITS):
+    """
+    Map RGB image to Spectra 6 palette using Lab color space.
     
-    # Convert image to Lab
-    img_lab = rgb_to_lab(np.array(img))
+    method='lab' computes exact per-pixel Lab distances band by band;
+    method='lut' looks every pixel up in a cached RGB→palette table
+    (lut_bits per channel, like the firmware's SPECTRA6_COLOR_LUT), which
+    is faster but maps colors near a palette boundary by their LUT cell.
+    """
+    if method == 'lut':
+        print(f"  Converting to Spectra 6 palette ({lut_bits}-bit Lab LUT)...")
+        closest_indices = lookup_palette_indices(np.asarray(img), SPECTRA_PALETTE, lut_bits)
+    else:
+        print(f"  Converting to Spectra 6 palette (Lab color space)...")
+        closest_indices = nearest_palette_lab(np.array(img))
     
+    # Map to Spectra color codes
+    return INDEX_TO_CODE[closest_indices]
+
+
+def nearest_palette_lab(rgb, band_rows=LAB_BAND_ROWS):
+    """Exact nearest Spectra palette index per pixel (CIE76 in Lab)."""
     # Convert palette to Lab
-    palette_lab = []
-    for r, g, b in SPECTRA_PALETTE:
-        rgb_single = np.array([[[r, g, b]]], dtype=np.uint8)
-        lab_single = rgb_to_lab(rgb_single)
-        palette_lab.append(lab_single[0, 0])
-    palette_lab = np.array(palette_lab)
-    
-    # For each pixel, find nearest palette color (CIE76 Delta E)
-    h, w = img_lab.shape[:2]
-    mapped = np.zeros((h, w), dtype=np.uint8)
-    
-    # Vectorized distance calculation (much faster than loop)
-    # Reshape for broadcasting: (h, w, 1, 3) - (6, 3) -> (h, w, 6)
-    img_lab_expanded = img_lab[:, :, np.newaxis, :]
-    palette_lab_expanded = palette_lab[np.newaxis, np.newaxis, :, :]
-    
-    # CIE76 Delta E (Euclidean distance in Lab space)
-    distances = np.sum((img_lab_expanded - palette_lab_expanded) ** 2, axis=-1)
+    palette_lab = rgb_to_lab(np.array([SPECTRA_PALETTE], dtype=np.uint8))[0]
     
-    # Find closest palette color for each pixel
-    closest_indices = np.argmin(distances, axis=-1)
+    h, w = rgb.shape[:2]
+    indices = np.empty((h, w), dtype=np.uint8)
+    band_lab = np.empty((min(band_rows, h), w, 3), dtype=np.float32)
     
-    # Map to Spectra color codes
-    for i, code in enumerate(SPECTRA_CODES):
-        mapped[closest_indices == i] = code
+    # Convert and match one band at a time so the (rows, w, 6) distance
+    # tensor never spans the whole frame
+    for y0 in range(0, h, band_rows):
+        y1 = min(h, y0 + band_rows)
+        lab = rgb_to_lab(rgb[y0:y1], out=band_lab[:y1 - y0], band_rows=band_rows)
+        
+        # CIE76 Delta E (Euclidean distance in Lab space)
+        # Reshape for broadcasting: (rows, w, 1, 3) - (6, 3) -> (rows, w, 6)
+        distances = np.sum((lab[:, :, np.newaxis, :] - palette_lab) ** 2, axis=-1)
+        
+        # Find closest palette color for each pixel
+        indices[y0:y1] = np.argmin(distances, axis=-1)
     
-    return mapped
+    return indices
 
 
-def save_as_bmp(mapped, output_path):
-    """Save mapped image as 24-bit BMP using Spectra palette RGB values."""
-    print(f"  Saving BMP: {output_path}")
+def save_as_bmp(mapped, output_path, indexed=False):
+    """
+    Save mapped image as BMP using Spectra palette RGB values.
     
-    h, w = mapped.shape
+    By default a 24-bit RGB BMP is written. With indexed=True the Spectra
+    codes are stored directly as 8-bit palette indices (palette entry N =
+    RGB of code N), a third of the size; EL133UF1_BMP reads both.
+    """
+    print(f"  Saving BMP: {output_path}")
     
-    # Convert Spectra codes back to RGB for BMP
-    rgb_img = np.zeros((h, w, 3), dtype=np.uint8)
-    for i, (r, g, b) in enumerate(SPECTRA_PALETTE):
-        code = SPECTRA_CODES[i]
-        mask = (mapped == code)
-        rgb_img[mask] = [r, g, b]
+    if indexed:
+        bmp = Image.fromarray(mapped, 'P')
+        bmp.putpalette(CODE_TO_RGB.ravel().tolist())
+    else:
+        # Convert Spectra codes back to RGB for BMP
+        bmp = Image.fromarray(CODE_TO_RGB[mapped], 'RGB')
     
     # Save as BMP
-    Image.fromarray(rgb_img, 'RGB').save(output_path, 'BMP')
+    bmp.save(output_path, 'BMP')
 
 
-def detect_objects_yolo(img, confidence=0.3, expand_margin=50):
-    """
-    Detect objects using YOLOv8 and generate keep-out masks.
-    
-    Args:
-        img: PIL Image (RGB)
-        confidence: Detection confidence threshold (0.0-1.0)
-        expand_margin: Pixels to expand around detected objects
-        
-    Returns:
-        keep_out_mask: Binary mask (0=safe, 255=keep out)
-    """
-    if not HAS_ML:
-        print("  WARNING: ML libraries not available, skipping object detection")
-        return None
-    
-    print(f"  Running YOLO object detection (confidence={confidence})...")
-    
-    # Convert PIL to numpy/cv2 format
-    img_np = np.array(img)
-    img_cv = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
-    
-    # Load YOLOv8 model (downloads automatically on first run)
-    try:
-        model = YOLO('yolov8n.pt')  # nano model (fastest)
-        # model = YOLO('yolov8s.pt')  # small model (more accurate)
-    except Exception as e:
-        print(f"  ERROR: Failed to load YOLO model: {e}")
-        return None
-    
-    # Run detection
-    results = model(img_cv, conf=confidence, verbose=False)
-    
-    # Create keep-out mask
-    h, w = img_np.shape[:2]
-    keep_out_mask = np.zeros((h, w), dtype=np.uint8)
-    
-    detections = 0
-    for result in results:
-        boxes = result.boxes
-        if boxes is not None and len(boxes) > 0:
-            for box in boxes:
-                # Get bounding box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                conf = box.conf[0].cpu().numpy()
-                cls = int(box.cls[0].cpu().numpy())
-                class_name = model.names[cls]
-                
-                # Expand box by margin
-                x1 = max(0, int(x1) - expand_margin)
-                y1 = max(0, int(y1) - expand_margin)
-                x2 = min(w, int(x2) + expand_margin)
-                y2 = min(h, int(y2) + expand_margin)
-                
-                # Mark as keep-out area
-                keep_out_mask[y1:y2, x1:x2] = 255
-                
-                detections += 1
-                print(f"    Detected: {class_name} (conf={conf:.2f}) at [{x1},{y1},{x2},{y2}]")
-    
-    if detections == 0:
-        print("    No objects detected")
-        return None
-    
-    print(f"    Total objects detected: {detections}")
-    
-    # Visualize keep-out areas (for debugging)
-    coverage = (keep_out_mask > 0).sum() / (h * w) * 100
-    print(f"    Keep-out coverage: {coverage:.1f}% of image")
-    
-    return keep_out_mask
-
-
-def save_keepout_map(keep_out_mask, output_path, img_filename):
+def save_as_s6(mapped, output_path, panel_layout=True, rotate_180=False):
     """
-    Save keep-out map in binary format.
-    
-    File format:
-        Header (16 bytes):
-            - Magic: "KOMAP" (5 bytes)
-            - Version: uint8 (1 byte) - currently 1
-            - Width: uint16 LE (2 bytes)
-            - Height: uint16 LE (2 bytes)
-            - Reserved: 6 bytes (for future use)
-        Data:
-            - Bitmap: (width * height + 7) / 8 bytes (1 bit per pixel)
-            - 1 = keep out, 0 = safe for text
+    Save mapped image as a native .s6 framebuffer file (packed 4bpp Spectra
+    codes, see eink_pipeline.framebuffer). With panel_layout the data is
+    already rotated and split into the two controller halves.
     """
-    if keep_out_mask is None:
-        print(f"  No keep-out map to save")
-        return
-    
-    print(f"  Saving keep-out map: {output_path}")
-    
-    h, w = keep_out_mask.shape
-    
-    # Pack bitmap (1 bit per pixel)
-    # Row-major order, MSB first within each byte
-    bitmap_bytes = []
-    for y in range(h):
-        for x in range(0, w, 8):
-            byte = 0
-            for bit in range(8):
-                if x + bit < w:
-                    if keep_out_mask[y, x + bit] > 0:
-                        byte |= (1 << (7 - bit))
-            bitmap_bytes.append(byte)
-    
-    # Write binary file
-    with open(output_path, 'wb') as f:
-        # Header
-        f.write(b'KOMAP')                          # Magic (5 bytes)
-        f.write(struct.pack('B', 1))               # Version (1 byte)
-        f.write(struct.pack('<H', w))              # Width (2 bytes LE)
-        f.write(struct.pack('<H', h))              # Height (2 bytes LE)
-        f.write(b'\x00' * 6)                       # Reserved (6 bytes)
-        
-        # Bitmap data
-        f.write(bytes(bitmap_bytes))
-    
-    file_size = os.path.getsize(output_path)
-    print(f"    Map file size: {file_size} bytes ({file_size / 1024:.1f} KB)")
-    
-    # Calculate theoretical size
-    bitmap_size = (w * h + 7) // 8
-    expected_size = 16 + bitmap_size
-    print(f"    Expected size: {expected_size} bytes (header=16, bitmap={bitmap_size})")
+    print(f"  Saving S6 framebuffer: {output_path}")
+    size = write_s6(mapped, output_path, panel_layout=panel_layout, rotate_180=rotate_180)
+    print(f"    Framebuffer size: {size} bytes ({size / 1024:.1f} KB)")
 
 
-def process_image(input_path, output_dir, use_ml=True, confidence=0.3, expand_margin=50):
-    """Process a single image: convert to Spectra 6 and generate keep-out map."""
+def process_image(input_path, output_dir, use_ml=True, confidence=0.3, expand_margin=50,
+                  color_match='lab', lut_bits=DEFAULT_LUT_BITS, indexed_bmp=False,
+                  output_format='bmp', s6_panel_layout=True, rotate_180=False, cache=None,
+                  backend='torch', model_path=None):
+    """
+    Process a single image: convert to Spectra 6 and generate keep-out map.
+    
+    With a ConversionCache, outputs of an unchanged image converted with the
+    same settings are copied from the cache instead of being recomputed.
+    """
     print(f"\n{'=' * 60}")
     print(f"Processing: {input_path}")
     print(f"{'=' * 60}")
     
-    # Load and resize image
+    input_stem = Path(input_path).stem
+    output_base = os.path.join(output_dir, input_stem)
+    
+    if cache is not None:
+        key = cache_key(input_path, {
+            'use_ml': use_ml, 'confidence': confidence, 'expand_margin': expand_margin,
+            'color_match': color_match, 'lut_bits': lut_bits, 'indexed_bmp': indexed_bmp,
+            'output_format': output_format, 's6_panel_layout': s6_panel_layout,
+            'rotate_180': rotate_180, 'backend': backend, 'model_path': model_path,
+        })
+        cached = cache.fetch(key, output_base)
+        if cached is not None:
+            print(f"\n✓ Unchanged, copied from cache:")
+            for path in sorted(cached):
+                print(f"  {path}")
+            print(f"{'=' * 60}\n")
+            return
+    
+    # Load and resize image, decoding at the smallest JPEG/HEIF scale that
+    # still fills the display
     print(f"Loading image...")
-    img = Image.open(input_path).convert('RGB')
-    orig_size = img.size
-    print(f"  Original size: {orig_size[0]}x{orig_size[1]}")
+    img = load_image(input_path, direction='landscape', mode='scale').convert('RGB')
+    print(f"  Decoded size: {img.width}x{img.height}")
     
     # Resize to display dimensions (maintain aspect ratio, crop to fit)
     print(f"  Resizing to {DISPLAY_WIDTH}x{DISPLAY_HEIGHT}...")
@@ -332,25 +277,31 @@ def process_image(input_path, output_dir, use_ml=True, confidence=0.3, expand_ma
     # ML object detection (if enabled)
     keep_out_mask = None
     if use_ml:
-        keep_out_mask = detect_objects_yolo(img, confidence, expand_margin)
+        keep_out_mask = detect_keepout_mask(img, confidence, expand_margin, segmentation=False,
+                                            backend=backend, model_path=model_path, verbose=True)
     
     # Convert to Spectra palette
-    mapped = map_to_spectra(img)
+    mapped = map_to_spectra(img, method=color_match, lut_bits=lut_bits)
     
     # Generate output filenames
-    input_stem = Path(input_path).stem
-    output_bmp = os.path.join(output_dir, f"{input_stem}.bmp")
-    output_map = os.path.join(output_dir, f"{input_stem}.map")
+    output_image = f"{output_base}.{output_format}"
+    output_map = f"{output_base}.map"
     
-    # Save BMP
-    save_as_bmp(mapped, output_bmp)
+    # Save BMP or native framebuffer
+    if output_format == 's6':
+        save_as_s6(mapped, output_image, panel_layout=s6_panel_layout, rotate_180=rotate_180)
+    else:
+        save_as_bmp(mapped, output_image, indexed=indexed_bmp)
     
     # Save keep-out map
     if keep_out_mask is not None:
-        save_keepout_map(keep_out_mask, output_map, input_stem)
+        save_keepout_map(keep_out_mask, output_map, verbose=True)
+    
+    if cache is not None:
+        cache.store(key, [output_image] + ([output_map] if keep_out_mask is not None else []))
     
     print(f"\n✓ Processing complete!")
-    print(f"  BMP:  {output_bmp}")
+    print(f"  {output_format.upper()}:  {output_image}")
     if keep_out_mask is not None:
         print(f"  MAP:  {output_map}")
     print(f"{'=' * 60}\n")
@@ -371,27 +322,101 @@ Examples:
   # Skip ML detection (faster, no keep-out map)
   python prepare_eink_image.py photo.jpg /sd_card/ --no-ml
 
-  # Process entire directory
-  for img in images/*.jpg; do
-      python prepare_eink_image.py "$img" /sd_card/
-  done
+  # Process a whole directory (and subdirectories) in one run; the YOLO
+  # model and color LUT are loaded once and shared by every image
+  python prepare_eink_image.py images/ /sd_card/
+
+  # Several files, directories and quoted globs, or a list of paths
+  python prepare_eink_image.py a.jpg b.png 'raw/**/*.jpg' /sd_card/
+  find ~/Photos -name '*.jpg' | python prepare_eink_image.py --from-list - /sd_card/
         """
     )
     
-    parser.add_argument('input', help='Input image file (JPG, PNG, etc.)')
+    parser.add_argument('inputs', nargs='*', metavar='input',
+                        help='Input image files (JPG, PNG, etc.), directories or glob patterns')
     parser.add_argument('output_dir', help='Output directory for BMP and map files')
+    parser.add_argument('--from-list', metavar='FILE',
+                        help="Also process the paths listed in FILE, one per line ('-' for stdin)")
+    parser.add_argument('--no-recursive', action='store_true',
+                        help='Only look at the top level of input directories')
+    parser.add_argument('--version', action='version', version=f'%(prog)s {__version__}')
     parser.add_argument('--no-ml', action='store_true', 
                         help='Skip ML object detection (no keep-out map)')
     parser.add_argument('--confidence', type=float, default=0.3,
                         help='YOLO confidence threshold (0.0-1.0, default: 0.3)')
     parser.add_argument('--expand', type=int, default=50,
                         help='Pixels to expand around detected objects (default: 50)')
-    
-    args = parser.parse_args()
+    parser.add_argument('--backend', choices=BACKENDS, default='torch',
+                        help='Detection runtime: torch (ultralytics), onnx (ONNX Runtime) or openvino (default: torch)')
+    parser.add_argument('--model-path',
+                        help='Local model file for --backend (default: the standard nano model name, '
+                             'see export_detection_model.py)')
+    parser.add_argument('--color-match', choices=['lab', 'lut'], default='lab',
+                        help='Palette mapping: lab (exact per-pixel Lab distance, default) or '
+                             'lut (cached RGB lookup table; faster, about 2%% of pixels differ at 6 bits)')
+    parser.add_argument('--lut-bits', type=int, choices=[4, 5, 6], default=DEFAULT_LUT_BITS,
+                        help=f'Bits per channel of the color LUT (default: {DEFAULT_LUT_BITS})')
+    parser.add_argument('--indexed-bmp', action='store_true',
+                        help='Write 8-bit palettized BMPs (1/3 the size of 24-bit RGB)')
+    parser.add_argument('--format', choices=['bmp', 's6'], default='bmp',
+                        help='Output image format: bmp, or s6 (packed 4bpp panel framebuffer; default: bmp)')
+    parser.add_argument('--s6-layout', choices=['panel', 'rows'], default='panel',
+                        help='s6 data layout: panel (pre-rotated controller halves) or rows (default: panel)')
+    parser.add_argument('--rotate-180', action='store_true',
+                        help='Bake a 180° rotation into s6 output (for panels mounted upside down)')
+    parser.add_argument('--cache-dir',
+                        help='Reuse outputs for unchanged images from this content-addressed cache directory')
+    parser.add_argument('--cache-max-size', type=int, default=DEFAULT_CACHE_MAX_MB,
+                        help=f'Cache size cap in MB, least recently used entries are evicted (default: {DEFAULT_CACHE_MAX_MB})')
+    parser.add_argument('--cache-stats', action='store_true',
+                        help='Print cache hit/miss counts and size after processing')
+    
+    # Intermixed so options may sit between the inputs and output_dir
+    args = parser.parse_intermixed_args()
+    
+    patterns = list(args.inputs)
+    if args.from_list:
+        try:
+            patterns += read_path_list(args.from_list)
+        except OSError as e:
+            print(f"ERROR: Cannot read input list: {e}", file=sys.stderr)
+            return 1
+    if not patterns:
+        parser.error('no inputs given (pass files, directories, globs or --from-list)')
     
     # Validate inputs
-    if not os.path.isfile(args.input):
-        print(f"ERROR: Input file not found: {args.input}", file=sys.stderr)
+    paths, missing = expand_input_paths(patterns)
+    failed = [(path, 'input not found') for path in missing]
+    for path in missing:
+        print(f"ERROR: Input not found: {path}", file=sys.stderr)
+    
+    def report_unreadable(path):
+        print(f"ERROR: Not a recognised image file: {path}", file=sys.stderr)
+        failed.append((path, 'not a recognised image file'))
+    
+    # Walk directories up front so an empty selection is reported before any model loads
+    image_files = []
+    seen = set()
+    output_names = {}
+    for path in iter_image_files(paths, recursive=not args.no_recursive, on_skip=report_unreadable):
+        # The same photo can be named twice, e.g. by a directory and a glob
+        real_path = os.path.realpath(path)
+        if real_path in seen:
+            continue
+        seen.add(real_path)
+        # Outputs are named after the file stem, so a/IMG_1.jpg and b/IMG_1.jpg
+        # (or x.jpg and x.png) would overwrite each other; the SD card's FAT
+        # file system also ignores case
+        stem = Path(path).stem
+        first = output_names.setdefault(stem.lower(), path)
+        if first != path:
+            print(f"ERROR: {path}: output name '{stem}' is already used by {first}; "
+                  f"rename one of them or convert them separately", file=sys.stderr)
+            failed.append((path, f"output name '{stem}' already used by {first}"))
+            continue
+        image_files.append(path)
+    if not image_files:
+        print("ERROR: No image files found", file=sys.stderr)
         return 1
     
     if not os.path.isdir(args.output_dir):
@@ -399,27 +424,52 @@ Examples:
         os.makedirs(args.output_dir, exist_ok=True)
     
     # Check ML availability
-    if not args.no_ml and not HAS_ML:
+    if not args.no_ml and not backend_available(args.backend):
         print("ERROR: ML libraries not installed. Either:", file=sys.stderr)
-        print("  1. Install: pip install torch ultralytics opencv-python", file=sys.stderr)
+        print(f"  1. Install: {BACKEND_REQUIREMENTS[args.backend]}", file=sys.stderr)
         print("  2. Use --no-ml flag to skip object detection", file=sys.stderr)
         return 1
     
-    # Process image
-    try:
-        process_image(
-            args.input, 
-            args.output_dir, 
-            use_ml=(not args.no_ml),
-            confidence=args.confidence,
-            expand_margin=args.expand
-        )
-        return 0
-    except Exception as e:
-        print(f"ERROR: {e}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
-        return 1
+    cache = None
+    if args.cache_dir:
+        cache = ConversionCache(args.cache_dir, args.cache_max_size * 1024 * 1024)
+    
+    # Process images; models and lookup tables stay loaded between them
+    succeeded = 0
+    for input_path in image_files:
+        try:
+            process_image(
+                input_path,
+                args.output_dir,
+                use_ml=(not args.no_ml),
+                confidence=args.confidence,
+                expand_margin=args.expand,
+                color_match=args.color_match,
+                lut_bits=args.lut_bits,
+                indexed_bmp=args.indexed_bmp,
+                output_format=args.format,
+                s6_panel_layout=(args.s6_layout == 'panel'),
+                rotate_180=args.rotate_180,
+                cache=cache,
+                backend=args.backend,
+                model_path=args.model_path
+            )
+            succeeded += 1
+        except Exception as e:
+            print(f"ERROR: {input_path}: {e}", file=sys.stderr)
+            import traceback
+            traceback.print_exc()
+            failed.append((input_path, str(e)))
+    
+    if cache is not None:
+        cache.prune()
+        if args.cache_stats:
+            print(format_cache_stats(cache.stats()))
+    
+    print(f"Batch complete: {succeeded} succeeded, {len(failed)} failed")
+    for path, reason in failed:
+        print(f"  FAILED: {path} ({reason})")
+    return 1 if failed else 0
 
 
 if __name__ == '__main__':
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Incrementally copy prepared images and keep-out maps to the SD card.
+
+Only files that are new or whose contents changed are written, each through
+a temporary file renamed into place. Run it after preparing images into a
+local staging directory so a refresh of an unchanged library writes nothing.
+
+Usage:
+    python sync_sd_card.py staging/ /media/sdcard/
+    python sync_sd_card.py staging/ /media/sdcard/ --delete
+    python sync_sd_card.py staging/ /media/sdcard/ --delete --dry-run
+"""
+
+import argparse
+import os
+import sys
+
+from eink_pipeline.sync import MANAGED_EXTENSIONS, sync_outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Copy only changed BMP/MAP outputs from a staging directory to the SD card'
+    )
+    parser.add_argument('staging_dir', help='Directory the images were prepared into')
+    parser.add_argument('dest_dir', help='SD card directory to update')
+    parser.add_argument('--delete', action='store_true',
+                        help='Remove managed files on the card that are no longer staged')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Report what would change without writing anything')
+    parser.add_argument('--ext', action='append', metavar='EXT',
+                        help=f'File extension to sync, repeatable (default: {" ".join(MANAGED_EXTENSIONS)})')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='List every copied or deleted file')
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.staging_dir):
+        print(f"ERROR: Staging directory not found: {args.staging_dir}", file=sys.stderr)
+        return 1
+
+    extensions = MANAGED_EXTENSIONS
+    if args.ext:
+        extensions = tuple(ext if ext.startswith('.') else '.' + ext for ext in args.ext)
+
+    result = sync_outputs(args.staging_dir, args.dest_dir,
+                          delete_orphans=args.delete, extensions=extensions,
+                          dry_run=args.dry_run, verbose=args.verbose)
+
+    prefix = 'Would sync' if args.dry_run else 'Synced'
+    print(f"{prefix} {args.staging_dir} -> {args.dest_dir}: "
+          f"{result['copied']} copied ({result['bytes_written'] / 1024:.1f} KB), "
+          f"{result['unchanged']} unchanged, {result['deleted']} deleted")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
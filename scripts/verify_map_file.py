@@ -8,11 +8,13 @@ a visualization showing the keep-out areas overlaid on the original image.
 Usage:
     python verify_map_file.py image.map
     python verify_map_file.py image.map --visualize image.bmp
+    python verify_map_file.py maps_dir/ --batch
 """
 
 import argparse
 import struct
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 try:
@@ -24,6 +26,10 @@ except ImportError:
     print("Warning: PIL not found. Install with: pip install pillow", file=sys.stderr)
 
 
+# Image types looked up next to a .map file in --batch mode
+IMAGE_EXTENSIONS = ('.bmp', '.png', '.jpg', '.jpeg')
+
+
 def read_map_file(map_path):
     """Read and parse a keep-out map file."""
     with open(map_path, 'rb') as f:
@@ -65,19 +71,12 @@ def read_map_file(map_path):
 
 
 def decode_bitmap(bitmap_data, width, height):
-    """Decode bitmap data into a 2D numpy array."""
-    bitmap = np.zeros((height, width), dtype=np.uint8)
-    
-    for y in range(height):
-        for x in range(width):
-            pixel_idx = y * width + x
-            byte_idx = pixel_idx // 8
-            bit_idx = 7 - (pixel_idx % 8)  # MSB first
-            
-            if byte_idx < len(bitmap_data):
-                if bitmap_data[byte_idx] & (1 << bit_idx):
-                    bitmap[y, x] = 255
-    
+    """Decode bitmap data into a 2D numpy array (255 = keep out, 0 = safe)."""
+    # View the payload without copying, unpack MSB-first in one call; a short
+    # payload is zero-padded, so missing bytes read as safe
+    packed = np.frombuffer(bitmap_data, dtype=np.uint8)
+    bitmap = np.unpackbits(packed, count=width * height).reshape(height, width)
+    bitmap *= 255
     return bitmap
 
 
@@ -95,21 +94,29 @@ def analyze_map(map_data):
     coverage = (keep_out_pixels / total_pixels) * 100
     
     # Find bounding boxes (connected components)
-    from scipy import ndimage
     try:
+        from scipy import ndimage
         labeled, num_features = ndimage.label(bitmap)
-        regions = []
         
-        for label in range(1, num_features + 1):
-            coords = np.argwhere(labeled == label)
-            if len(coords) > 0:
-                y_min, x_min = coords.min(axis=0)
-                y_max, x_max = coords.max(axis=0)
-                area = len(coords)
-                regions.append({
-                    'bbox': (x_min, y_min, x_max, y_max),
-                    'area': area
-                })
+        # Per-label stats in one pass each: areas and coordinate sums via
+        # bincount, bounding boxes via find_objects (label 0 = background)
+        labels = labeled.ravel()
+        ys, xs = np.indices(labeled.shape)
+        areas = np.bincount(labels, minlength=num_features + 1)
+        x_sums = np.bincount(labels, weights=xs.ravel(), minlength=num_features + 1)
+        y_sums = np.bincount(labels, weights=ys.ravel(), minlength=num_features + 1)
+        
+        regions = []
+        for label, slices in enumerate(ndimage.find_objects(labeled), start=1):
+            if slices is None:
+                continue
+            y_slice, x_slice = slices
+            area = int(areas[label])
+            regions.append({
+                'bbox': (x_slice.start, y_slice.start, x_slice.stop - 1, y_slice.stop - 1),
+                'area': area,
+                'centroid': (float(x_sums[label]) / area, float(y_sums[label]) / area),
+            })
         
         # Sort by area (largest first)
         regions.sort(key=lambda r: r['area'], reverse=True)
@@ -144,16 +151,12 @@ def visualize_map(map_data, analysis, bmp_path, output_path):
         # Resize image to match map
         img = img.resize((analysis['width'], analysis['height']), Image.Resampling.LANCZOS)
     
-    # Create overlay
-    overlay = Image.new('RGBA', img.size, (0, 0, 0, 0))
-    draw = ImageDraw.Draw(overlay)
-    
-    # Draw keep-out areas (semi-transparent red)
+    # Create overlay with keep-out areas in semi-transparent red
     bitmap = analysis['bitmap']
-    for y in range(bitmap.shape[0]):
-        for x in range(bitmap.shape[1]):
-            if bitmap[y, x] > 0:
-                draw.point((x, y), fill=(255, 0, 0, 128))
+    overlay_array = np.zeros(bitmap.shape + (4,), dtype=np.uint8)
+    overlay_array[bitmap > 0] = (255, 0, 0, 128)
+    overlay = Image.fromarray(overlay_array, 'RGBA')
+    draw = ImageDraw.Draw(overlay)
     
     # Draw bounding boxes if available
     if analysis['regions']:
@@ -177,6 +180,76 @@ def visualize_map(map_data, analysis, bmp_path, output_path):
     return True
 
 
+def find_map_pairs(directory):
+    """
+    Find every .map file in a directory together with its image.
+    
+    Returns a list of (map_path, image_path) tuples; image_path is None
+    when no image with the same stem exists.
+    """
+    pairs = []
+    for map_path in sorted(Path(directory).glob('*.map')):
+        image_path = None
+        for ext in IMAGE_EXTENSIONS:
+            candidate = map_path.with_suffix(ext)
+            if candidate.is_file():
+                image_path = candidate
+                break
+        pairs.append((map_path, image_path))
+    return pairs
+
+
+def visualize_pair(map_path, image_path, output_path):
+    """Verify one map and write its visualization. Returns an error string or None."""
+    try:
+        map_data = read_map_file(map_path)
+        analysis = analyze_map(map_data)
+        if not visualize_map(map_data, analysis, image_path, output_path):
+            return "visualization failed"
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def visualize_batch(directory, output_dir=None, jobs=None):
+    """Visualize all map/image pairs in a directory using a process pool."""
+    if not HAS_PIL:
+        print("Error: PIL required for visualization. Install: pip install pillow", file=sys.stderr)
+        return 1
+    
+    pairs = find_map_pairs(directory)
+    if not pairs:
+        print(f"Error: No .map files found in {directory}", file=sys.stderr)
+        return 1
+    
+    output_dir = Path(output_dir) if output_dir else Path(directory)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    print(f"Visualizing {len(pairs)} map file(s) from {directory}")
+    failed = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for map_path, image_path in pairs:
+            if image_path is None:
+                print(f"✗ {map_path.name}: no matching image ({', '.join(IMAGE_EXTENSIONS)})")
+                failed += 1
+                continue
+            output_path = output_dir / (map_path.stem + '_viz.png')
+            futures[executor.submit(visualize_pair, map_path, image_path, output_path)] = map_path
+        
+        for future in as_completed(futures):
+            error = future.result()
+            if error:
+                print(f"✗ {futures[future].name}: {error}")
+                failed += 1
+            else:
+                print(f"✓ {futures[future].name}")
+    
+    print()
+    print(f"Visualized: {len(pairs) - failed}, Failed: {failed}")
+    return 1 if failed else 0
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Verify and visualize keep-out map files',
@@ -191,15 +264,29 @@ Examples:
   
   # Custom output path
   python verify_map_file.py landscape.map --visualize landscape.bmp --output viz.png
+  
+  # Visualize every .map in a directory next to its .bmp/.png
+  python verify_map_file.py /sd_card/ --batch --output viz/ --jobs 8
         """
     )
     
-    parser.add_argument('map_file', help='Keep-out map file to verify (.map)')
+    parser.add_argument('map_file', help='Keep-out map file to verify (.map), or a directory with --batch')
     parser.add_argument('--visualize', metavar='BMP', help='Generate visualization with BMP overlay')
-    parser.add_argument('--output', '-o', help='Output path for visualization (default: <map>_viz.png)')
+    parser.add_argument('--output', '-o', help='Output path for visualization (default: <map>_viz.png); '
+                                               'output directory with --batch (default: input directory)')
+    parser.add_argument('--batch', action='store_true',
+                        help='Visualize all map/image pairs in the map_file directory in parallel')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Worker processes for --batch (default: one per CPU core)')
     
     args = parser.parse_args()
     
+    if args.batch:
+        if not Path(args.map_file).is_dir():
+            print(f"Error: Directory not found: {args.map_file}", file=sys.stderr)
+            return 1
+        return visualize_batch(args.map_file, args.output, args.jobs)
+    
     # Check file exists
     if not Path(args.map_file).is_file():
         print(f"Error: File not found: {args.map_file}", file=sys.stderr)
@@ -255,7 +342,8 @@ Examples:
                 x1, y1, x2, y2 = region['bbox']
                 w = x2 - x1 + 1
                 h = y2 - y1 + 1
-                print(f"    #{i+1}: [{x1},{y1}]-[{x2},{y2}] ({w}×{h}, {region['area']} px)")
+                cx, cy = region['centroid']
+                print(f"    #{i+1}: [{x1},{y1}]-[{x2},{y2}] ({w}×{h}, {region['area']} px, centre {cx:.0f},{cy:.0f})")
     
     print()
     
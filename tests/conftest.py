@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The pipeline modules are imported the way the scripts import them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
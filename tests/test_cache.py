@@ -0,0 +1,106 @@
+import os
+
+from eink_pipeline import cache as cache_module
+from eink_pipeline.cache import ConversionCache, cache_key
+
+PARAMS = {'mode': 'scale', 'dither': 1}
+
+
+def make_outputs(directory, name, image=b'image bytes', keep_out=b'map bytes'):
+    """Write a fake conversion result; returns the output paths."""
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = [directory / f'{name}.bmp', directory / f'{name}.map']
+    paths[0].write_bytes(image)
+    paths[1].write_bytes(keep_out)
+    return [str(path) for path in paths]
+
+
+def test_hit_copies_stored_outputs(tmp_path):
+    source = tmp_path / 'photo.jpg'
+    source.write_bytes(b'jpeg data')
+    cache = ConversionCache(str(tmp_path / 'cache'))
+
+    key = cache_key(source, PARAMS)
+    assert cache.fetch(key, str(tmp_path / 'out' / 'first')) is None
+    cache.store(key, make_outputs(tmp_path / 'out', 'first'))
+
+    # Same contents under another name and place hit the same entry
+    moved = tmp_path / 'elsewhere' / 'renamed.jpg'
+    moved.parent.mkdir()
+    moved.write_bytes(b'jpeg data')
+    base = str(tmp_path / 'out' / 'second')
+    written = cache.fetch(cache_key(moved, PARAMS), base)
+
+    assert sorted(written) == [base + '.bmp', base + '.map']
+    assert open(base + '.bmp', 'rb').read() == b'image bytes'
+    assert open(base + '.map', 'rb').read() == b'map bytes'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_changes_with_options_contents_and_version(tmp_path, monkeypatch):
+    source = tmp_path / 'photo.jpg'
+    source.write_bytes(b'jpeg data')
+    cache = ConversionCache(str(tmp_path / 'cache'))
+    key = cache_key(source, PARAMS)
+    cache.store(key, make_outputs(tmp_path / 'out', 'photo'))
+    base = str(tmp_path / 'out' / 'again')
+
+    assert cache.fetch(cache_key(source, dict(PARAMS, dither=3)), base) is None
+    assert cache.fetch(cache_key(source, dict(PARAMS, extra=None)), base) is None
+
+    source.write_bytes(b'edited jpeg data')
+    assert cache.fetch(cache_key(source, PARAMS), base) is None
+    source.write_bytes(b'jpeg data')
+
+    monkeypatch.setattr(cache_module, 'CACHE_VERSION', cache_module.CACHE_VERSION + 1)
+    assert cache.fetch(cache_key(source, PARAMS), base) is None
+    monkeypatch.undo()
+
+    assert cache.fetch(cache_key(source, PARAMS), base) is not None
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_failed_store_leaves_no_entry_or_temporary_files(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cache = ConversionCache(str(cache_dir))
+    outputs = make_outputs(tmp_path / 'out', 'photo')
+
+    # The second file vanishes before it is copied
+    cache.store('ab' * 32, outputs + [str(tmp_path / 'out' / 'missing.s6')])
+
+    assert cache.fetch('ab' * 32, str(tmp_path / 'out' / 'x')) is None
+    assert [path for _, _, path in cache._entries()] == []
+    shards = [os.listdir(cache_dir / shard) for shard in os.listdir(cache_dir)]
+    assert all(names == [] for names in shards)
+
+
+def test_store_never_replaces_a_published_entry(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache'))
+    key = 'cd' * 32
+    cache.store(key, make_outputs(tmp_path / 'out', 'first', image=b'first'))
+    cache.store(key, make_outputs(tmp_path / 'out', 'second', image=b'second'))
+
+    base = str(tmp_path / 'out' / 'fetched')
+    cache.fetch(key, base)
+    assert open(base + '.bmp', 'rb').read() == b'first'
+
+
+def test_prune_evicts_least_recently_used_entries(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache'))
+    keys = [f'{i:02x}' * 32 for i in range(3)]
+    for age, key in zip((300, 200, 100), keys):
+        cache.store(key, make_outputs(tmp_path / 'out', key))
+        entry = cache._entry_dir(key)
+        os.utime(entry, (os.path.getmtime(entry) - age,) * 2)
+    entry_size = cache.stats()['bytes'] // 3
+
+    # Using the oldest entry makes it the most recent
+    cache.fetch(keys[0], str(tmp_path / 'out' / 'used'))
+
+    cache.max_bytes = 2 * entry_size
+    assert cache.prune() == 1
+    assert not os.path.exists(cache._entry_dir(keys[1]))
+    assert os.path.isdir(cache._entry_dir(keys[0]))
+    assert os.path.isdir(cache._entry_dir(keys[2]))
+    assert cache.prune() == 0
+    assert cache.stats()['entries'] == 2
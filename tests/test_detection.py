@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from eink_pipeline.detection import (_DETECTOR_CLASSES, Detector, TorchDetector, _ExportedYoloDetector,
+                                     remove_letterbox_padding)
+from eink_pipeline.pipeline import keepout_mask_from_detections
+
+
+class _Array:
+    """Stand-in for a torch tensor: only .cpu().numpy() is used."""
+
+    def __init__(self, array):
+        self.array = np.asarray(array)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class _Result:
+    def __init__(self, box, score, cls, mask):
+        self.boxes = type('Boxes', (), {'xyxy': _Array([box]), 'conf': _Array([score]),
+                                        'cls': _Array([cls])})()
+        self.masks = type('Masks', (), {'data': _Array(mask[np.newaxis])})()
+
+
+class _PaddingModel:
+    """
+    Mimics ultralytics on a batch of differently shaped images: every frame
+    is letterboxed into one 640x640 square and masks keep that padding.
+    """
+
+    size = 640
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+    def __call__(self, images, conf, verbose):
+        results = []
+        for image, box in zip(images, self.boxes):
+            width, height = image.size
+            gain = min(self.size / width, self.size / height)
+            left = round((self.size - round(width * gain)) / 2 - 0.1)
+            top = round((self.size - round(height * gain)) / 2 - 0.1)
+            x1, y1, x2, y2 = box
+            mask = np.zeros((self.size, self.size), dtype=np.float32)
+            mask[round(y1 * gain) + top:round(y2 * gain) + top,
+                 round(x1 * gain) + left:round(x2 * gain) + left] = 1.0
+            results.append(_Result(box, 0.9, 0, mask))
+        return results
+
+
+def _box_mask(size, box):
+    width, height = size
+    x1, y1, x2, y2 = box
+    mask = np.zeros((height, width), dtype=bool)
+    mask[y1:y2, x1:x2] = True
+    return mask
+
+
+def _iou(a, b):
+    return np.logical_and(a, b).sum() / np.logical_or(a, b).sum()
+
+
+def test_mixed_orientation_batch_masks_line_up():
+    images = [Image.new('RGB', (1600, 1200)), Image.new('RGB', (1200, 1600))]
+    boxes = [(200, 300, 600, 900), (700, 100, 1100, 500)]
+    detector = TorchDetector.__new__(TorchDetector)
+    detector.model = _PaddingModel(boxes)
+    detector.names = {0: 'person'}
+
+    for image, box, result in zip(images, boxes, detector.detect(images, 0.3)):
+        width, height = image.size
+        mask = keepout_mask_from_detections(result, height, width, expand_margin=0)
+        assert _iou(mask > 0, _box_mask(image.size, box)) > 0.98
+
+
+def test_remove_letterbox_padding_keeps_unpadded_masks():
+    masks = np.random.default_rng(0).random((2, 480, 640)).astype(np.float32)
+    assert np.array_equal(remove_letterbox_padding(masks, (1600, 1200)), masks)
+
+
+def test_remove_letterbox_padding_crops_square_padding():
+    masks = np.zeros((1, 640, 640), dtype=np.float32)
+    masks[:, 80:560, :] = 1.0
+    cropped = remove_letterbox_padding(masks, (1600, 1200))
+    assert cropped.shape == (1, 480, 640)
+    assert cropped.all()
+
+
+def test_every_backend_implements_the_detector_interface():
+    for backend, detector_class in _DETECTOR_CLASSES.items():
+        assert issubclass(detector_class, Detector), backend
+    with pytest.raises(TypeError):
+        _ExportedYoloDetector()
@@ -0,0 +1,25 @@
+from PIL import Image
+
+from eink_pipeline.discovery import iter_image_files
+
+
+def test_explicit_files_are_trusted_beyond_the_sniff_table(tmp_path):
+    bmp = tmp_path / 'photo.bmp'
+    Image.new('RGB', (8, 6)).save(bmp)
+    junk = tmp_path / 'notes.jpg'
+    junk.write_bytes(b'not an image')
+
+    skipped = []
+    found = list(iter_image_files([str(bmp), str(junk)], on_skip=skipped.append))
+    assert found == [str(bmp)]
+    assert skipped == [str(junk)]
+
+
+def test_walk_skips_hidden_entries_and_unknown_extensions(tmp_path):
+    Image.new('RGB', (8, 6)).save(tmp_path / 'a.jpg')
+    Image.new('RGB', (8, 6)).save(tmp_path / '._a.jpg')
+    Image.new('RGB', (8, 6)).save(tmp_path / 'b.bmp')
+    (tmp_path / '.hidden').mkdir()
+    Image.new('RGB', (8, 6)).save(tmp_path / '.hidden' / 'c.jpg')
+
+    assert list(iter_image_files([str(tmp_path)])) == [str(tmp_path / 'a.jpg')]
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from eink_pipeline.dither import PALETTE_COLORS, closest_palette_color, quantize_atkinson
+
+
+def reference_atkinson(image):
+    """The original raster-order Atkinson loop, one pixel at a time."""
+    img_array = np.array(image.convert('RGB'))
+    height, width, _ = img_array.shape
+    working_img = img_array.astype(np.float32)
+
+    for y in range(height):
+        for x in range(width):
+            old_pixel = working_img[y, x].copy()
+            idx = closest_palette_color(tuple(np.clip(old_pixel, 0, 255).astype(int)))
+            new_pixel = np.array(PALETTE_COLORS[idx], dtype=np.float32)
+            working_img[y, x] = new_pixel
+            error = old_pixel - new_pixel
+
+            if x + 1 < width:
+                working_img[y, x + 1] += error * (1/8)
+            if y + 1 < height:
+                if x - 1 >= 0:
+                    working_img[y + 1, x - 1] += error * (1/8)
+                working_img[y + 1, x] += error * (1/4)
+                if x + 1 < width:
+                    working_img[y + 1, x + 1] += error * (1/8)
+
+    return Image.fromarray(np.clip(working_img, 0, 255).astype(np.uint8))
+
+
+def random_image(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+
+
+def gradient_image(width, height):
+    y, x = np.mgrid[0:height, 0:width]
+    rgb = np.stack([x * 255 // max(width - 1, 1),
+                    y * 255 // max(height - 1, 1),
+                    (x + y) * 255 // max(width + height - 2, 1)], axis=-1)
+    return Image.fromarray(rgb.astype(np.uint8))
+
+
+@pytest.mark.parametrize('width, height', [(23, 17), (8, 31), (1, 40), (40, 1), (1, 1)])
+def test_atkinson_matches_raster_reference(width, height):
+    for image in (random_image(width, height), gradient_image(width, height)):
+        assert np.array_equal(np.asarray(quantize_atkinson(image)),
+                              np.asarray(reference_atkinson(image)))
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from eink_pipeline.enhance import FILTER_BAND_ROWS, enhance_image, enhance_image_chain
+
+
+def photo_like_image(width, height, seed=0):
+    """Smooth colour gradients with a little sensor noise."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([120 + 80 * np.sin(x / 23),
+                     100 + 60 * np.cos(y / 17),
+                     140 + 50 * np.sin((x + y) / 31)], axis=-1)
+    base += rng.integers(-3, 4, base.shape)
+    return Image.fromarray(np.clip(base, 0, 255).astype(np.uint8))
+
+
+def noise_image(width, height, low=0, high=256, seed=0):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(low, high, (height, width, 3), dtype=np.uint8))
+
+
+def graphics_image(width, height):
+    """One-pixel grid, hard-edged colour blocks and text-like strokes."""
+    rgb = np.full((height, width, 3), 255, dtype=np.uint8)
+    rgb[::4] = 0
+    rgb[:, ::5] = 0
+    rgb[height // 3:, :width // 2] = (255, 0, 0)
+    rgb[2 * height // 3:, width // 3:] = (0, 0, 255)
+    rgb[height // 2:height // 2 + 2, 1::3] = (255, 255, 0)
+    return Image.fromarray(rgb)
+
+
+IMAGES = {
+    'photo': lambda: photo_like_image(160, 120),
+    'photo_odd': lambda: photo_like_image(61, 47),
+    'noise': lambda: noise_image(53, 2 * FILTER_BAND_ROWS + 5),
+    'noise_64_192': lambda: noise_image(40, 33, 64, 193),
+    'graphics': lambda: graphics_image(97, 71),
+    'tiny': lambda: noise_image(3, 3),
+    'thin': lambda: noise_image(9, 2),
+}
+
+SETTINGS = [
+    (1.0, 1.0, 1.0),
+    (1.1, 1.2, 1.2),    # converter defaults
+    (0.8, 1.5, 0.5),
+    (1.3, 0.7, 2.0),
+    (1.0, 2.0, 1.0),
+]
+
+
+@pytest.mark.parametrize('name', IMAGES)
+@pytest.mark.parametrize('brightness, contrast, saturation', SETTINGS)
+def test_fused_stage_matches_chain_exactly(name, brightness, contrast, saturation):
+    image = IMAGES[name]()
+    fused = enhance_image(image, brightness, contrast, saturation)
+    chain = enhance_image_chain(image, brightness, contrast, saturation)
+    assert fused.size == chain.size and fused.mode == chain.mode
+    np.testing.assert_array_equal(np.asarray(fused), np.asarray(chain))
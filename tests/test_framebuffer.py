@@ -0,0 +1,33 @@
+import numpy as np
+
+from eink_pipeline.framebuffer import (S6_FLAG_PORTRAIT, S6_FLAG_ROTATE_180, S6_HEADER,
+                                       encode_s6, panel_halves)
+
+
+def random_codes(height, width, seed=0):
+    return np.random.default_rng(seed).integers(0, 7, (height, width), dtype=np.uint8)
+
+
+def test_portrait_frame_uses_panel_layout_turned_clockwise():
+    portrait = random_codes(1600, 1200)
+    data = encode_s6(portrait)
+
+    _, _, layout, width, height, flags = S6_HEADER.unpack(data[:S6_HEADER.size])
+    assert (width, height) == (1200, 1600)
+    assert flags == S6_FLAG_PORTRAIT
+    # Same bytes as the landscape frame the image turns into, top edge at x = 1599
+    left, right = panel_halves(np.rot90(portrait, k=-1))
+    assert data[S6_HEADER.size:] == left.tobytes() + right.tobytes()
+    assert np.array_equal(np.rot90(portrait, k=-1)[:, 1599], portrait[0])
+
+
+def test_portrait_rotate_180_sets_both_flags():
+    data = encode_s6(random_codes(1600, 1200), rotate_180=True)
+    flags = S6_HEADER.unpack(data[:S6_HEADER.size])[5]
+    assert flags == S6_FLAG_PORTRAIT | S6_FLAG_ROTATE_180
+
+
+def test_landscape_frame_is_not_flagged_portrait():
+    data = encode_s6(random_codes(1200, 1600))
+    assert S6_HEADER.unpack(data[:S6_HEADER.size])[5] == 0
+    assert len(data) == S6_HEADER.size + 1600 * 1200 // 2
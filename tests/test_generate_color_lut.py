@@ -0,0 +1,19 @@
+import pytest
+
+from generate_color_lut import (COLOR_LUT_MAX_BITS, COLOR_LUT_MIN_BITS, DEFAULT_PALETTE,
+                                format_lut_as_c_header, generate_lut, generate_lut_scalar)
+
+# A differently calibrated panel, to cover palettes other than the default
+PANEL_B_PALETTE = [(25, 20, 30), (230, 235, 225), (235, 200, 70),
+                   (170, 50, 60), (60, 80, 150), (70, 130, 90)]
+
+
+@pytest.mark.parametrize('bits', range(COLOR_LUT_MIN_BITS, COLOR_LUT_MAX_BITS + 1))
+def test_vectorized_header_matches_scalar_generator(bits):
+    palettes = [('SPECTRA6', 'default palette', DEFAULT_PALETTE),
+                ('PANEL_B', 'panel_b.txt', PANEL_B_PALETTE)]
+    vectorized = [(name, bits, description, generate_lut(palette, bits))
+                  for name, description, palette in palettes]
+    scalar = [(name, bits, description, generate_lut_scalar(palette, bits))
+              for name, description, palette in palettes]
+    assert format_lut_as_c_header(vectorized) == format_lut_as_c_header(scalar)
@@ -0,0 +1,81 @@
+import struct
+
+import numpy as np
+import pytest
+
+from eink_pipeline.komap import KOMAP_HEADER, encode_keepout_map, write_keepout_map
+from verify_map_file import decode_bitmap, read_map_file
+
+
+def baseline_encode(keep_out_mask):
+    """The original writer: header, then each row packed MSB-first to whole bytes."""
+    h, w = keep_out_mask.shape
+    bitmap_bytes = []
+    for y in range(h):
+        for x in range(0, w, 8):
+            byte = 0
+            for bit in range(8):
+                if x + bit < w:
+                    if keep_out_mask[y, x + bit] > 0:
+                        byte |= (1 << (7 - bit))
+            bitmap_bytes.append(byte)
+    header = b'KOMAP' + struct.pack('B', 1) + struct.pack('<H', w) + struct.pack('<H', h) + b'\x00' * 6
+    return header + bytes(bitmap_bytes)
+
+
+def firmware_is_keepout(bitmap, width, x, y):
+    """TextPlacementAnalyzer::isKeepOut: one continuous MSB-first bitstream."""
+    pixel = y * width + x
+    return bool(bitmap[pixel // 8] & (1 << (7 - pixel % 8)))
+
+
+def random_mask(height, width, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((height, width)) < 0.4).astype(np.uint8) * 255
+
+
+# (height, width); most widths are not multiples of 8
+SHAPES = [(7, 13), (9, 1), (3, 17), (5, 24), (1, 1), (11, 30), (4, 10)]
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_round_trip_through_verify_map_file(tmp_path, shape):
+    height, width = shape
+    mask = random_mask(height, width, seed=width * 31 + height)
+    path = tmp_path / 'mask.map'
+
+    written = write_keepout_map(mask, path)
+    assert written == KOMAP_HEADER.size + (width * height + 7) // 8
+    assert path.stat().st_size == written
+
+    map_data = read_map_file(path)
+    assert (map_data['width'], map_data['height']) == (width, height)
+    decoded = decode_bitmap(map_data['bitmap'], width, height)
+    np.testing.assert_array_equal(decoded, (mask > 0).astype(np.uint8) * 255)
+
+    for y in range(height):
+        for x in range(width):
+            assert firmware_is_keepout(map_data['bitmap'], width, x, y) == (mask[y, x] > 0)
+
+
+@pytest.mark.parametrize('shape', SHAPES + [(1200, 1600), (1600, 1200)])
+def test_bytes_match_baseline_writer_on_byte_aligned_rows(shape):
+    height, width = shape
+    mask = random_mask(height, width, seed=1)
+    encoded = encode_keepout_map(mask)
+    baseline = baseline_encode(mask)
+
+    # Header fields never changed
+    assert encoded[:KOMAP_HEADER.size] == baseline[:KOMAP_HEADER.size]
+    if width % 8 == 0:
+        assert encoded == baseline
+    else:
+        # The old writer padded every row to a byte, which disagrees with the
+        # documented (width * height + 7) / 8 size and the firmware reader;
+        # its rows still carry the same pixels once the padding is dropped
+        row_bytes = (width + 7) // 8
+        rows = np.frombuffer(baseline[KOMAP_HEADER.size:], dtype=np.uint8).reshape(height, row_bytes)
+        baseline_pixels = np.unpackbits(rows, axis=1)[:, :width]
+        stream = np.frombuffer(encoded[KOMAP_HEADER.size:], dtype=np.uint8)
+        encoded_pixels = np.unpackbits(stream, count=width * height).reshape(height, width)
+        np.testing.assert_array_equal(encoded_pixels, baseline_pixels)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from eink_pipeline.masks import dilate_box, resize_nearest
+
+
+def naive_dilate(mask, size):
+    """Maximum over the size x size window anchored at size // 2, as cv2.dilate does."""
+    height, width = mask.shape
+    anchor = size // 2
+    out = np.zeros_like(mask)
+    for y in range(height):
+        for x in range(width):
+            top, left = max(y - anchor, 0), max(x - anchor, 0)
+            out[y, x] = mask[top:y - anchor + size, left:x - anchor + size].max()
+    return out
+
+
+def sparse_mask(height, width, density=0.03, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((height, width)) < density).astype(np.uint8) * 255
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 4, 7, 10, 25])
+def test_dilate_box_matches_naive_max_filter(size):
+    mask = sparse_mask(23, 31, seed=size)
+    np.testing.assert_array_equal(dilate_box(mask, size), naive_dilate(mask, size))
+
+
+@pytest.mark.parametrize('size', [2, 5, 6])
+def test_dilate_box_at_image_edges(size):
+    mask = np.zeros((12, 17), dtype=np.uint8)
+    mask[0, 0] = mask[0, -1] = mask[-1, 0] = mask[-1, -1] = 255
+    mask[5, 0] = mask[0, 8] = 255
+    np.testing.assert_array_equal(dilate_box(mask, size), naive_dilate(mask, size))
+
+
+@pytest.mark.parametrize('shape', [(6, 9), (1, 10), (10, 1), (1, 1)])
+@pytest.mark.parametrize('size', [12, 40, 101])
+def test_dilate_box_with_margin_larger_than_image(shape, size):
+    mask = sparse_mask(*shape, density=0.2, seed=size)
+    np.testing.assert_array_equal(dilate_box(mask, size), naive_dilate(mask, size))
+
+
+def test_dilate_box_keeps_values_and_dtype():
+    mask = np.zeros((5, 5), dtype=np.uint8)
+    mask[2, 2] = 255
+    result = dilate_box(mask, 3)
+    assert result.dtype == np.uint8
+    assert result.sum() == 9 * 255
+    assert dilate_box(mask, 1) is not mask
+
+
+@pytest.mark.parametrize('src, dst', [((160, 120), (1600, 1200)), ((120, 160), (1200, 1600)),
+                                      ((160, 160), (1600, 1200)), ((7, 5), (3, 2)), ((5, 7), (13, 11))])
+def test_resize_nearest_picks_floor_scaled_source_pixels(src, dst):
+    (src_w, src_h), (dst_w, dst_h) = src, dst
+    mask = np.arange(src_w * src_h, dtype=np.int32).reshape(src_h, src_w)
+    expected = mask[(np.arange(dst_h) * src_h // dst_h)[:, None], np.arange(dst_w) * src_w // dst_w]
+    np.testing.assert_array_equal(resize_nearest(mask, dst), expected)
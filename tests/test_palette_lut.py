@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from eink_pipeline.palette_lut import DEFAULT_LUT_BITS, lookup_palette_indices
+from prepare_eink_image import SPECTRA_PALETTE, nearest_palette_lab
+
+
+def photo_like_image(width, height, seed=0):
+    """Smooth colour gradients with a little sensor noise."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([120 + 80 * np.sin(x / 23),
+                     100 + 60 * np.cos(y / 17),
+                     140 + 50 * np.sin((x + y) / 31)], axis=-1)
+    base += rng.integers(-3, 4, base.shape)
+    return np.clip(base, 0, 255).astype(np.uint8)
+
+
+def test_palette_colors_map_to_themselves():
+    rgb = np.array([SPECTRA_PALETTE], dtype=np.uint8)
+    expected = np.arange(len(SPECTRA_PALETTE))
+    assert lookup_palette_indices(rgb, SPECTRA_PALETTE)[0].tolist() == expected.tolist()
+    assert nearest_palette_lab(rgb)[0].tolist() == expected.tolist()
+
+
+# Largest share of pixels the LUT may map differently from exact Lab matching
+@pytest.mark.parametrize('bits, max_mismatch', [(4, 0.10), (5, 0.05), (DEFAULT_LUT_BITS, 0.025)])
+def test_lut_mismatch_against_exact_lab_is_bounded(bits, max_mismatch):
+    rgb = photo_like_image(320, 240)
+    exact = nearest_palette_lab(rgb)
+    mismatch = np.mean(lookup_palette_indices(rgb, SPECTRA_PALETTE, bits) != exact)
+    assert mismatch <= max_mismatch
@@ -0,0 +1,73 @@
+import os
+
+from eink_pipeline.sync import sync_outputs
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def listing(directory):
+    return {name: (directory / name).read_bytes() for name in sorted(os.listdir(directory))}
+
+
+def test_copies_new_and_changed_files_and_skips_unchanged(tmp_path):
+    staging, card = tmp_path / 'staging', tmp_path / 'card'
+    write(staging / 'a.bmp', b'aaaa')
+    write(staging / 'a.map', b'map')
+    write(staging / 'b.s6', b'new')
+    write(card / 'a.bmp', b'aaaa')
+    write(card / 'b.s6', b'old')
+
+    result = sync_outputs(staging, card)
+    assert result == {'copied': 2, 'unchanged': 1, 'deleted': 0, 'bytes_written': 6}
+    assert listing(card) == listing(staging)
+
+    # A second run has nothing left to write
+    result = sync_outputs(staging, card)
+    assert result == {'copied': 0, 'unchanged': 3, 'deleted': 0, 'bytes_written': 0}
+
+
+def test_delete_only_removes_managed_orphans(tmp_path):
+    staging, card = tmp_path / 'staging', tmp_path / 'card'
+    write(staging / 'keep.bmp', b'keep')
+    write(card / 'keep.bmp', b'keep')
+    write(card / 'gone.bmp', b'gone')
+    write(card / 'gone.map', b'gone')
+    write(card / 'holiday.png', b'not ours')
+    write(card / 'config.txt', b'settings')
+
+    result = sync_outputs(staging, card, delete_orphans=True)
+    assert result['deleted'] == 2
+    assert sorted(os.listdir(card)) == ['config.txt', 'holiday.png', 'keep.bmp']
+
+
+def test_orphans_are_kept_without_delete(tmp_path):
+    staging, card = tmp_path / 'staging', tmp_path / 'card'
+    staging.mkdir()
+    write(card / 'gone.bmp', b'gone')
+
+    assert sync_outputs(staging, card)['deleted'] == 0
+    assert os.listdir(card) == ['gone.bmp']
+
+
+def test_dry_run_leaves_the_card_untouched(tmp_path):
+    staging, card = tmp_path / 'staging', tmp_path / 'card'
+    write(staging / 'a.bmp', b'new')
+    write(card / 'a.bmp', b'old')
+    write(card / 'gone.bmp', b'gone')
+    before = listing(card)
+
+    result = sync_outputs(staging, card, delete_orphans=True, dry_run=True)
+    assert result == {'copied': 1, 'unchanged': 0, 'deleted': 1, 'bytes_written': 3}
+    assert listing(card) == before
+
+
+def test_dry_run_does_not_create_the_destination(tmp_path):
+    staging, card = tmp_path / 'staging', tmp_path / 'card'
+    write(staging / 'a.bmp', b'new')
+
+    result = sync_outputs(staging, card, delete_orphans=True, dry_run=True)
+    assert result['copied'] == 1
+    assert not card.exists()